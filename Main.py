@@ -3,172 +3,349 @@ import random
 
 import sc2
 from sc2.ids.ability_id import AbilityId as AbilID
+from sc2.ids.buff_id import BuffId
 from sc2.ids.unit_typeid import UnitTypeId as UnitID
 
+from actions import ActionFilter
+from buildorder import BUILDORDER_PATH, BuildOrder, IncomeTracker, tech_time, travel_time
+from event_log import EventLog, log_name
+from fire_control import FireControl
+from map_analysis import MapData
+from opponent_memory import OpponentMemory, prioritize
+from placement import PlacementGrid
+from saturation import WorkerManager
+from scheduler import StepScheduler
+from spatial import Spatial
+from squads import SquadManager
+from step_profiler import StepProfiler
+from threat_map import ThreatMap
+from unit_history import UnitHistory
+from unit_index import UnitIndex
+
 
 class RoachRush(sc2.BotAI):
-    def __init__(self):
-        # set of things that come from a larva
-        self.from_larva = {UnitID.DRONE, UnitID.OVERLORD, UnitID.ZERGLING, UnitID.ROACH}
-        # set of things that come from a drone
-        self.from_drone = {UnitID.SPAWNINGPOOL, UnitID.EXTRACTOR, UnitID.ROACHWARREN}
-        # buildorder
-        self.buildorder = [
-            UnitID.DRONE,
-            UnitID.SPAWNINGPOOL,
-            UnitID.DRONE,
-            UnitID.DRONE,
-            UnitID.EXTRACTOR,
-            UnitID.DRONE,
-            UnitID.OVERLORD,
-            UnitID.ROACHWARREN,
-            UnitID.QUEEN,
-            UnitID.OVERLORD,
-            "END",
-        ]
-        # current step of the buildorder
-        self.buildorder_step = 0
+    def __init__(
+        self,
+        profile: bool = False,
+        buildorder_path: str = BUILDORDER_PATH,
+        log_events: bool = True,
+        deterministic: bool = False,
+    ):
+        # buildorder, loaded from a json file so it can be changed without changing the code
+        self.buildorder = BuildOrder.load(buildorder_path)
+        # measures our income to know when we can afford the next step
+        self.income = IncomeTracker()
         # expansion we need to clear next, changed in 'send_idle_army'
         self.army_target = None
         # generator we need to cycle through expansions, created in 'send_idle_army'
         self.clear_map = None
         # unit groups, created in 'set_unit_groups'
+        self.index = None
         self.queens = None
         self.army = None
+        self.hatcheries = None
+        # what our units and enemy units did in the last frames, updated in 'set_unit_groups'
+        self.unit_history = UnitHistory()
+        # keeps track of which drone works on which resource, used in 'manage_workers'
+        self.worker_manager = WorkerManager()
+        # tags of queens we told to inject in the last step, used in 'inject'
+        self.injecting_queens = set()
+        # groups the army into squads every frame, used in 'control_army'
+        self.squads = SquadManager()
+        # decides which unit shoots at which enemy so no enemy gets more damage than it needs, used in 'control_army'
+        self.fire_control = FireControl()
         # flag we wave in case we want to give up
         self.surrendered: bool = False
         # expansions ordered by distance from starting location
         self.ordered_expansions = None
+        # order in which the army visits expansions to clear the map
+        self.clear_map_route = None
+        # position in our main base that the ramp is in direction of
+        self.main_ramp = None
+        # games against the same ladder opponent, created in 'start_step' if we know the opponent
+        self.memory = None
+        # our own placement grid to find building positions, created in 'start_step'
+        self.placement = None
+        # where enemies can shoot at, used to find safe positions when kiting, created in 'start_step'
+        self.threat_map = None
+        # times every phase of 'on_step', does nothing if profile is False
+        self.profiler = StepProfiler(enabled=profile)
+        # drops commands that units already follow, created in 'start_step' and used at the end of 'on_step'
+        self.action_filter = None
+        # what happened in the game, written to data/events by a background thread and in 'on_end'
+        self.events = EventLog(enabled=log_events)
+        # runs the parts of 'on_step' by priority, low priority parts wait for a later step if we are out of time,
+        # deterministic runs everything in every step and never changes game_step
+        self.scheduler = StepScheduler(deterministic=deterministic)
+        self.scheduler.add("do_buildorder", self.do_buildorder, 0)
+        self.scheduler.add("inject", self.inject, 1, max_interval=4)
+        # split workers in the first step, then keep minerals and extractors saturated
+        self.scheduler.add("manage_workers", self.manage_workers, 2, max_interval=4)
+        # buildorder completed, start second phase of the bot
+        self.scheduler.add(
+            "build_additional_overlords", self.build_additional_overlords, 3, max_interval=4, condition=self.army_phase
+        )
+        self.scheduler.add("build_army", self.build_army, 3, max_interval=4, condition=self.army_phase)
+        self.scheduler.add("set_army_target", self.set_army_target, 4, condition=self.army_phase)
+        # control_army always runs, but only for units that fight if we are out of time
+        self.scheduler.add("control_army", self.control_army, 4, condition=self.army_phase)
+        # remember what we see of the opponent for the next games against it
+        self.scheduler.add("observe_opponent", self.observe_opponent, 5, max_interval=8, condition=self.has_memory)
+
+    def _initialize_variables(self):
+        # python-sc2 resets opponent_id when the game starts, keep the one the ladder gave us
+        opponent_id = getattr(self, "opponent_id", None)
+        super()._initialize_variables()
+        self.opponent_id = opponent_id
 
     async def on_step(self, iteration):
         # dont do anything if we surrendered already
         if self.surrendered:
             return
+        profiler = self.profiler
+        profiler.start_step(iteration, self.state.game_loop)
+        # python-sc2 only tells us how much time we have if the game has a step time limit
+        time_budget = getattr(self, "time_budget_available", None)
+        self.scheduler.start_step(time_budget)
         # create selections one time for the whole frame
         # so that we dont have to filter the same units multiple times
-        self.set_unit_groups()
+        with profiler.phase("set_unit_groups"):
+            self.set_unit_groups()
         # things to only do in the first step
         if iteration == 0:
-            await self.start_step()
+            profiler.attach(self._client)
+            with profiler.phase("start_step"):
+                await self.start_step()
+            # the setup of the first step must not make the tasks skip the worker split
+            self.scheduler.start_step(time_budget)
         # give up if no drones are left
         if not self.workers:
             # surrender phrase for ladder manager
             await self.chat_send("(pineapple)")
             self.surrendered = True
+            self.events.log(self.state.game_loop, "surrender", supply=self.supply_used)
             return
-        await self.do_buildorder()
-        await self.inject()
-        self.fill_extractors()
-        # buildorder completed, start second phase of the bot
-        if self.buildorder[self.buildorder_step] == "END":
-            self.build_additional_overlords()
-            self.build_army()
-            self.set_army_target()
-            self.control_army()
+        await self.scheduler.run(profiler)
+        # only send commands that change something and group equal commands so they are sent together
+        self.actions[:] = self.action_filter.filter(self.actions)
+        # step less often if our steps take too long, more often if they are fast
+        self._client.game_step = self.scheduler.end_step()
+        profiler.end_step(self.action_filter.sent, self.action_filter.suppressed)
+        self.log_step()
+
+    async def on_unit_destroyed(self, unit_tag):
+        self.worker_manager.unit_destroyed(unit_tag)
+
+    async def on_building_construction_complete(self, unit):
+        self.worker_manager.structure_ready(unit)
+
+    async def on_end(self, game_result):
+        self.events.log(self.state.game_loop, "end", result=game_result.name)
+        self.events.close()
+        if self.memory:
+            self.memory.save(self, game_result, self.buildorder.name)
+        # save the step times of this game if we profiled it
+        if self.profiler.enabled:
+            print(self.profiler.report())
+            self.profiler.write_timeline()
 
     def set_unit_groups(self):
-        self.queens = self.units(UnitID.QUEEN)
-        self.army = self.units.filter(lambda unit: unit.type_id in {UnitID.ROACH, UnitID.ZERGLING})
+        # index all units by type, every selection from it is only calculated once per frame
+        self.index = UnitIndex(self)
+        self.queens = self.index.own(UnitID.QUEEN)
+        self.army = self.index.own({UnitID.ROACH, UnitID.ZERGLING})
+        self.hatcheries = self.index.own(UnitID.HATCHERY)
+        self.unit_history.update(self.state.game_loop, self.units, self.enemy_units)
 
     async def start_step(self):
         # send a welcome message
         await self.chat_send("(kappa)")
-        # split workers
-        for drone in self.workers:
-            # find closest mineral patch
-            closest_mineral_patch = self.mineral_field.closest_to(drone)
-            self.do(drone.gather(closest_mineral_patch))
-        # prepare ordered expansions, sort by distance to start location
-        self.ordered_expansions = sorted(
-            self.expansion_locations.keys(), key=lambda expansion: expansion.distance_to(self.start_location)
+        # use walking distances if the map was analyzed already, see map_analysis.py
+        map_data = MapData.load(self.game_info)
+        if map_data:
+            self.ordered_expansions = map_data.ordered_expansions(self.start_location)
+            self.clear_map_route = map_data.clear_map_route(self.start_location)
+            self.main_ramp = map_data.main_ramp(self.start_location)
+        else:
+            # prepare ordered expansions, sort by distance to start location
+            self.ordered_expansions = sorted(
+                self.expansion_locations.keys(), key=lambda expansion: expansion.distance_to(self.start_location)
+            )
+            # start with enemy starting location, then cycle through all expansions
+            self.clear_map_route = list(reversed(self.ordered_expansions))
+            self.main_ramp = self.main_base_ramp.depot_in_middle
+        # visit the bases where we found this opponent in earlier games first
+        if self.opponent_id:
+            self.memory = OpponentMemory(self.opponent_id)
+            known_bases = self.memory.enemy_bases(self.game_info.map_name, self.enemy_start_locations[0])
+            self.clear_map_route = prioritize(self.clear_map_route, known_bases)
+        # keep track of free building positions ourselves
+        self.placement = PlacementGrid(self)
+        self.action_filter = ActionFilter(self._game_data)
+        self.threat_map = ThreatMap(self.game_info)
+        self.events.open(log_name(self.opponent_id))
+        self.events.log(self.state.game_loop, "start", map=self.game_info.map_name, buildorder=self.buildorder.name)
+        # only do on_step every nth frame, 8 is standard, the scheduler changes it during the game
+        self._client.game_step = self.scheduler.game_step
+
+    def log_step(self):
+        # a few numbers of every step, only plain values so logging stays cheap
+        self.events.log(
+            self.state.game_loop,
+            "step",
+            ms=round(1000 * self.scheduler.elapsed(), 2),
+            game_step=self.scheduler.game_step,
+            skipped=self.scheduler.skipped,
+            actions=self.action_filter.sent,
+            suppressed=self.action_filter.suppressed,
+            minerals=self.minerals,
+            vespene=self.vespene,
+            supply=self.supply_used,
+            army=len(self.army),
         )
-        # only do on_step every nth frame, 8 is standard
-        self._client.game_step = 2
 
-    def fill_extractors(self):
-        for extractor in self.gas_buildings:
-            # returns negative value if not enough workers
-            if extractor.surplus_harvesters < 0:
-                drones_with_no_resource = self.workers.filter(
-                    lambda unit: not unit.is_carrying_resource and unit.is_collecting
-                )
-                if drones_with_no_resource:
-                    # surplus_harvesters is negative when workers are missing
-                    for n in range(-extractor.surplus_harvesters):
-                        # prevent crash by only taking the minimum
-                        drone = drones_with_no_resource[min(n, drones_with_no_resource.amount) - 1]
-                        self.do(drone.gather(extractor))
-            # take out workers if we somehow have too many
-            elif extractor.surplus_harvesters > 0:
-                drones_in_extractor = self.workers.filter(
-                    lambda unit: not unit.is_carrying_resource and unit.order_target == extractor.tag
-                )
-                if drones_in_extractor:
-                    for n in range(extractor.surplus_harvesters):
-                        # prevent crash by only taking the minimum
-                        drone = drones_in_extractor[min(n, drones_in_extractor.amount) - 1]
-                        closest_mineral_patch = self.mineral_field.closest_to(drone)
-                        self.do(drone.gather(closest_mineral_patch))
+    def army_phase(self) -> bool:
+        return self.buildorder.done
+
+    def has_memory(self) -> bool:
+        return self.memory is not None
+
+    def observe_opponent(self):
+        self.memory.observe(self, self.clear_map_route)
+
+    def manage_workers(self):
+        # the worker manager only gives commands to drones whose job changed,
+        # drones that wait for money to build something are not its business
+        idle_drones = self.index.own(UnitID.DRONE, idle=True).tags_not_in(self.buildorder.builders.values())
+        for drone, resource in self.worker_manager.update(self, idle_drones):
+            self.do(drone.gather(resource))
 
     async def do_buildorder(self):
-        # only try to build something if we have 25 minerals, otherwise we dont have enough anyway
-        if self.minerals < 25:
+        buildorder = self.buildorder
+        if buildorder.done:
             return
-        current_step = self.buildorder[self.buildorder_step]
-        # do nothing if we are done already or dont have enough resources for current step of build order
-        if current_step == "END" or not self.can_afford(current_step):
-            return
-        # check if current step needs larva
-        if current_step in self.from_larva and self.larva:
-            self.do(self.larva.first.train(current_step))
-        # check if current step needs drone
-        elif current_step in self.from_drone:
-            if current_step == UnitID.EXTRACTOR:
-                # get geysers that dont have extractor on them
-                geysers = self.vespene_geyser.filter(
-                    lambda g: all(g.position != e.position for e in self.units(UnitID.EXTRACTOR))
-                )
-                # pick closest
+        self.income.update(self)
+        # money of earlier steps that wait for tech or a producer, later steps may only use what is left
+        reserved_minerals = reserved_vespene = 0
+        # larva and hatcheries that got a command in this step already
+        used_producers = set()
+        for index in buildorder.upcoming():
+            step = buildorder.steps[index]
+            # supply gates keep the order, nothing after them may start early
+            if self.supply_used < step.supply:
+                return
+            cost = self.calculate_cost(step.unit)
+            minerals = reserved_minerals + cost.minerals
+            vespene = reserved_vespene + cost.vespene
+            affordable = self.minerals >= minerals and self.vespene >= vespene
+            tech_ready = self.tech_requirement_progress(step.unit) >= 1
+            if UnitID.DRONE in step.producers:
+                started = await self.build_structure(index, step, affordable and tech_ready, minerals, vespene)
+                producer_ready = True
+            else:
+                producer = self.step_producer(step, used_producers)
+                producer_ready = producer is not None and self.supply_left >= self.calculate_supply_cost(step.unit)
+                started = affordable and tech_ready and producer_ready
+                if started:
+                    used_producers.add(producer.tag)
+                    self.do(producer.train(step.unit), subtract_cost=True, subtract_supply=True)
+            if started:
+                self.events.log(self.state.game_loop, "build_step", index=index, unit=step.unit.name)
+                buildorder.finish(index)
+                continue
+            # only money is missing, later steps must not spend it
+            if tech_ready and producer_ready:
+                return
+            # this step waits for something else, later steps may start if we can afford both
+            reserved_minerals = minerals
+            reserved_vespene = vespene
+
+    def step_producer(self, step, used_producers: set):
+        # larva or idle building that can make the unit of this step
+        if UnitID.LARVA in step.producers:
+            producers = self.larva
+        else:
+            producers = self.index.own(step.producers, ready=True, idle=True)
+        return next((unit for unit in producers if unit.tag not in used_producers), None)
+
+    async def build_structure(self, index: int, step, can_start: bool, minerals: float, vespene: float) -> bool:
+        # sends a drone to the building position early enough that it arrives when we can afford the building,
+        # returns true if the building was ordered
+        buildorder = self.buildorder
+        position = buildorder.positions.get(index)
+        if position is None:
+            if step.unit == UnitID.EXTRACTOR:
+                # get geysers that dont have extractor on them and pick the closest
+                extractors = self.index.own(UnitID.EXTRACTOR)
+                geysers = self.vespene_geyser.filter(lambda g: all(g.position != e.position for e in extractors))
+                if not geysers:
+                    return False
                 position = geysers.closest_to(self.start_location)
             else:
-                if current_step == UnitID.ROACHWARREN:
-                    # check tech requirement
-                    if not self.structures(UnitID.SPAWNINGPOOL).ready:
-                        return
                 # pick position towards ramp to avoid building between hatchery and resources
-                buildings_around = self.townhalls(UnitID.HATCHERY).first.position.towards(
-                    self.main_base_ramp.depot_in_middle, 7
-                )
-                # look for position until we find one that is not already used
-                position = None
-                while not position:
-                    position = await self.find_placement(building=current_step, near=buildings_around, placement_step=4)
-                    if any(building.position == position for building in self.units.structure):
-                        position = None
-            # got building position, pick collecting worker without resources that will get there the fastest
-            worker = self.workers.filter(lambda unit: not unit.is_carrying_minerals and unit.is_collecting).closest_to(
-                position
-            )
-            self.do(worker.build(current_step, position))
-        elif current_step == UnitID.QUEEN:
-            # tech requirement check
-            if not self.structures(UnitID.SPAWNINGPOOL).ready:
-                return
-            hatch = self.townhalls(UnitID.HATCHERY).first
-            self.do(hatch.train(UnitID.QUEEN))
-        print(f"{self.time_formatted} STEP {self.buildorder_step:2} {current_step.name}")
-        self.buildorder_step += 1
+                buildings_around = self.hatcheries.first.position.towards(self.main_ramp, 7)
+                # look for a free position on our own grid and let the client confirm the best ones in one request
+                position = await self.placement.find_placement(step.unit, buildings_around, placement_step=4)
+                # try again next step if nothing fits right now
+                if not position:
+                    return False
+            buildorder.positions[index] = position
+        if step.unit != UnitID.EXTRACTOR:
+            # keep the position free until the building is started
+            self.placement.reserve(step.unit, position)
+        # use the drone we sent ahead, otherwise a collecting drone without minerals that gets there the fastest
+        worker = self.workers.find_by_tag(buildorder.builders.get(index, 0))
+        if not worker:
+            workers = self.workers.tags_not_in(buildorder.builders.values())
+            if not workers:
+                return False
+            collecting = workers.filter(lambda unit: not unit.is_carrying_minerals and unit.is_collecting)
+            worker = (collecting or workers).closest_to(position)
+        if can_start:
+            self.do(worker.build(step.unit, position), subtract_cost=True)
+            # dont give the drone gather commands while it is on its way
+            self.worker_manager.release(worker.tag)
+            return True
+        # start walking if the drone would arrive after we have the money and the tech
+        if buildorder.builders.get(index) != worker.tag:
+            wait = max(self.income.time_until(self, minerals, vespene), tech_time(self, step.unit))
+            if wait <= travel_time(worker, position):
+                buildorder.builders[index] = worker.tag
+                self.worker_manager.release(worker.tag)
+                self.do(worker.move(position.position))
+        return False
 
     async def inject(self):
-        if not self.queens:
+        hatcheries = self.index.own(UnitID.HATCHERY, ready=True)
+        if not self.queens or not hatcheries:
             return
-        for queen in self.queens.idle:
-            abilities = await self.get_available_abilities(queen)
-            # check if queen can inject
-            # its also possible to use queen.energy >= 25 to save the async call
-            if AbilID.EFFECT_INJECTLARVA in abilities:
-                hatch = self.townhalls(UnitID.HATCHERY).first
-                self.do(queen(AbilID.EFFECT_INJECTLARVA, hatch))
+        # check if queens can inject by looking at their energy, this saves one async call per queen
+        queens = self.index.own(UnitID.QUEEN, idle=True).filter(lambda queen: queen.energy >= 25)
+        # queens that got an inject order last step but are still idle with enough energy didnt inject,
+        # we dont trust the energy check for them and ask the client for all of them in one request
+        unsure_queens = queens.tags_in(self.injecting_queens)
+        if unsure_queens:
+            abilities = await self._client.query_available_abilities(unsure_queens)
+            cannot_inject = {
+                queen.tag
+                for queen, queen_abilities in zip(unsure_queens, abilities)
+                if AbilID.EFFECT_INJECTLARVA not in queen_abilities
+            }
+            queens = queens.tags_not_in(cannot_inject)
+        self.injecting_queens = set()
+        injected_hatcheries = set()
+        for queen in queens:
+            # prefer hatcheries that are not injected yet and that no other queen was sent to, then the closest one
+            hatch = min(
+                hatcheries,
+                key=lambda h: (
+                    h.tag in injected_hatcheries or h.has_buff(BuffId.QUEENSPAWNLARVATIMER),
+                    queen.distance_to(h),
+                ),
+            )
+            injected_hatcheries.add(hatch.tag)
+            self.injecting_queens.add(queen.tag)
+            self.do(queen(AbilID.EFFECT_INJECTLARVA, hatch))
 
     def build_army(self):
         # we cant build any unit with less than 50 minerals
@@ -176,16 +353,16 @@ class RoachRush(sc2.BotAI):
             return
         # rebuild lost queen
         if (
-            self.structures(UnitID.SPAWNINGPOOL).ready
+            self.index.own(UnitID.SPAWNINGPOOL, ready=True)
             and not self.queens
             and not self.already_pending(UnitID.QUEEN)
-            and self.townhalls(UnitID.HATCHERY).idle
+            and self.index.own(UnitID.HATCHERY, idle=True)
             and self.can_afford(UnitID.QUEEN)
         ):
-            hatch = self.townhalls(UnitID.HATCHERY).first
+            hatch = self.hatcheries.first
             self.do(hatch.train(UnitID.QUEEN))
             return
-        if self.larva and self.structures(UnitID.ROACHWARREN).ready:
+        if self.larva and self.index.own(UnitID.ROACHWARREN, ready=True):
             if self.can_afford(UnitID.ROACH):
                 # note that this only builds one unit per step
                 larva = self.larva.pop()
@@ -200,7 +377,7 @@ class RoachRush(sc2.BotAI):
         # rebuild lost workers if we have roaches
         if (
             self.larva
-            and self.units(UnitID.ROACH).ready
+            and self.index.own(UnitID.ROACH, ready=True)
             and self.supply_workers + self.already_pending(UnitID.DRONE) < 16
             and self.can_afford(UnitID.DRONE)
         ):
@@ -212,93 +389,120 @@ class RoachRush(sc2.BotAI):
         # sets the next waypoint for the army in case there is nothing on the map
         # if we didnt start to clear the map already
         if not self.clear_map:
-            # start with enemy starting location, then cycle through all expansions
-            self.clear_map = itertools.cycle(reversed(self.ordered_expansions))
+            # cycle through all expansions in the order prepared in 'start_step'
+            self.clear_map = itertools.cycle(self.clear_map_route)
             self.army_target = next(self.clear_map)
+            self.log_army_target()
         # we can see the expansion but there seems to be nothing there, get next
         if self.units.closer_than(6, self.army_target):
             self.army_target = next(self.clear_map)
+            self.log_army_target()
+
+    def log_army_target(self):
+        self.events.log(self.state.game_loop, "army_target", x=self.army_target.x, y=self.army_target.y)
 
     def control_army(self):
-        # calculate actions for the army units
-        army = self.units.filter(lambda unit: unit.type_id in {UnitID.ROACH, UnitID.ZERGLING})
+        # calculate actions for the army units, the selection was already made in 'set_unit_groups'
+        army = self.army
         # dont do anything if we dont have an army
         if not army:
             return
+        # units close to each other form a squad, units that dont fight get one order for the whole squad
+        squads = self.squads.update(army)
+        # out of time, only give orders to units that fight, the others keep their last order
+        engaged_only = self.scheduler.remaining() <= 0
         # we can only fight ground units and we dont want to fight larva or eggs
         ground_enemies = self.enemy_units.filter(
             lambda unit: not unit.is_flying and unit.type_id not in {UnitID.LARVA, UnitID.EGG}
         )
         # we dont see anything so start to clear the map
         if not ground_enemies:
-            for unit in army:
-                # clear found structures
+            # calculate all distances between army and structures at once
+            if self.enemy_structures:
+                spatial = Spatial(army, self.enemy_structures)
+            for squad in squads:
+                # clear found structures, the one closest to the squad first
                 if self.enemy_structures:
-                    # focus down low hp structures first
-                    in_range_structures = self.enemy_structures.in_attack_range_of(unit)
-                    if in_range_structures:
-                        lowest_hp = min(in_range_structures, key=lambda e: (e.health + e.shield, e.tag))
-                        if unit.weapon_cooldown == 0:
-                            self.do(unit.attack(lowest_hp))
-                        else:
-                            # dont go closer than 1 with roaches to use ranged attack
-                            if unit.ground_range > 1:
-                                self.do(unit.move(lowest_hp.position.towards(unit, 1 + lowest_hp.radius)))
-                            else:
-                                self.do(unit.move(lowest_hp.position))
-                    else:
-                        self.do(unit.move(self.enemy_structures.closest_to(unit)))
+                    target = self.enemy_structures.closest_to(squad.center)
                 # check bases to find new structures
                 else:
-                    self.do(unit.move(self.army_target))
+                    target = self.army_target
+                for index in squad.indices:
+                    unit = army[index]
+                    # focus down low hp structures first
+                    if self.enemy_structures:
+                        in_range_structures = spatial.targets_in_range(index)
+                        if in_range_structures.size:
+                            lowest_hp = spatial.lowest_hp(in_range_structures)
+                            if unit.weapon_cooldown == 0:
+                                self.do(unit.attack(lowest_hp))
+                            else:
+                                # dont go closer than 1 with roaches to use ranged attack
+                                if unit.ground_range > 1:
+                                    self.do(unit.move(lowest_hp.position.towards(unit, 1 + lowest_hp.radius)))
+                                else:
+                                    self.do(unit.move(lowest_hp.position))
+                            continue
+                    if not engaged_only:
+                        self.do(unit.move(target))
             return
         # create selection of dangerous enemy units.
-        enemy_fighters = ground_enemies.filter(lambda u: u.can_attack) + self.enemy_structures(
+        enemy_fighters = ground_enemies.filter(lambda u: u.can_attack) + self.index.enemy(
             {UnitID.BUNKER, UnitID.SPINECRAWLER, UnitID.PHOTONCANNON}
         )
-        for unit in army:
-            if enemy_fighters:
-                # select enemies in range
-                in_range_enemies = enemy_fighters.in_attack_range_of(unit)
-                if in_range_enemies:
-                    # prioritize workers
-                    workers = in_range_enemies({UnitID.DRONE, UnitID.SCV, UnitID.PROBE})
-                    if workers:
-                        in_range_enemies = workers
-                    # special micro for ranged units
-                    if unit.ground_range > 1:
-                        # attack if weapon not on cooldown
-                        if unit.weapon_cooldown == 0:
-                            # attack enemy with lowest hp of the ones in range
-                            lowest_hp = min(in_range_enemies, key=lambda e: (e.health + e.shield, e.tag))
-                            self.do(unit.attack(lowest_hp))
-                        else:
-                            # micro away from closest unit
-                            # move further away if too many enemies are near
-                            friends_in_range = army.in_attack_range_of(unit)
-                            closest_enemy = in_range_enemies.closest_to(unit)
-                            distance = unit.ground_range + unit.radius + closest_enemy.radius
-                            if (
-                                len(friends_in_range) <= len(in_range_enemies)
-                                and closest_enemy.ground_range <= unit.ground_range
-                            ):
-                                distance += 1
-                            else:
-                                # if more than 5 units friends are close, use distance one shorter than range
-                                # to let other friendly units get close enough as well and not block each other
-                                if len(army.closer_than(7, unit.position)) >= 5:
-                                    distance -= -1
-                            self.do(unit.move(closest_enemy.position.towards(unit, distance)))
+        # calculate all distances between army and enemies at once instead of once per unit
+        if enemy_fighters:
+            spatial = Spatial(army, enemy_fighters)
+            # add up the dps of all enemies once, kiting units look up safe cells in it
+            self.threat_map.update(enemy_fighters)
+            # units that attack in this step share the enemies in range between them in one go
+            fire_targets = self.fire_control.allocate(spatial, self.state.game_loop)
+        for squad in squads:
+            # no dangerous enemy at all, attack closest anything
+            if not enemy_fighters:
+                if engaged_only:
+                    continue
+                target = ground_enemies.closest_to(squad.center)
+                for index in squad.indices:
+                    self.do(army[index].attack(target))
+                continue
+            # units without enemies in range go to the enemy closest to their squad
+            target = enemy_fighters.closest_to(squad.center)
+            for index in squad.indices:
+                unit = army[index]
+                # select enemies in range, prioritize workers
+                in_range_enemies = spatial.targets_in_range(index, prefer_workers=True)
+                if not in_range_enemies.size:
+                    if not engaged_only:
+                        self.do(unit.move(target))
+                # special micro for ranged units
+                elif unit.ground_range > 1:
+                    # attack if weapon not on cooldown
+                    if unit.weapon_cooldown == 0:
+                        self.do(unit.attack(fire_targets[index]))
                     else:
-                        # target fire with melee units
-                        lowest_hp = min(in_range_enemies, key=lambda e: (e.health + e.shield, e.tag))
-                        self.do(unit.attack(lowest_hp))
+                        # micro away from closest unit
+                        # move further away if too many enemies are near
+                        closest_enemy = spatial.closest(index, in_range_enemies)
+                        distance = unit.ground_range + unit.radius + closest_enemy.radius
+                        if (
+                            spatial.friends_in_range(index) <= in_range_enemies.size
+                            and closest_enemy.ground_range <= unit.ground_range
+                        ):
+                            distance += 1
+                        else:
+                            # if more than 5 units friends are close, use distance one shorter than range
+                            # to let other friendly units get close enough as well and not block each other
+                            if spatial.friends_closer_than(index, 7) >= 5:
+                                distance -= -1
+                        # keep the distance to where the enemy will be in the next step if it keeps moving
+                        enemy_position = self.unit_history.predicted_position(closest_enemy, self._client.game_step)
+                        retreat = enemy_position.towards(unit, distance)
+                        # dont kite into the range of other enemies
+                        self.do(unit.move(self.threat_map.safest_position(unit.position, retreat)))
                 else:
-                    # no unit in range, go to closest
-                    self.do(unit.move(enemy_fighters.closest_to(unit)))
-            # no dangerous enemy at all, attack closest anything
-            else:
-                self.do(unit.attack(ground_enemies.closest_to(unit)))
+                    # target fire with melee units
+                    self.do(unit.attack(fire_targets[index]))
 
     def build_additional_overlords(self):
         # build more overlords after buildorder
@@ -314,9 +518,9 @@ class RoachRush(sc2.BotAI):
             self.do(self.larva.first.train(UnitID.OVERLORD))
 
 
-def main():
+def main(profile: bool = False):
     # create bot instance
-    bot = sc2.player.Bot(sc2.Race.Zerg, RoachRush())
+    bot = sc2.player.Bot(sc2.Race.Zerg, RoachRush(profile=profile))
     # fixed race seems to use different strats than sc2.Race.Random
     # choose a race for the opponent builtin bot
     race = random.choice([sc2.Race.Zerg, sc2.Race.Terran, sc2.Race.Protoss, sc2.Race.Random])
@@ -3,6 +3,7 @@ import argparse
 import sys
 import asyncio
 import logging
+import time
 import aiohttp
 
 import sc2
@@ -58,32 +59,123 @@ def run_ladder_game(bot):
     g = join_ladder_game(host=host, port=host_port, players=[bot], realtime=False, portconfig=portconfig)
 
     # Run it
-    result = asyncio.get_event_loop().run_until_complete(g)
+    result = asyncio.run(g)
     return result, args.OpponentId
 
 
+class LadderConnection:
+    # Owns the aiohttp session and websocket of one ladder game and closes both when the game is over.
+    # Every request to the sc2 client is timed, see latency_stats.
+    def __init__(
+        self, host, port, connect_timeout=5, retries=5, retry_delay=1, max_wait=30, heartbeat=None, max_msg_size=0
+    ):
+        self.ws_url = f"ws://{host}:{port}/sc2api"
+        # seconds for one attempt, the ladder server runs on the same machine and answers fast if it listens
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        # seconds for all attempts together, so a missing server fails the game quickly
+        self.max_wait = max_wait
+        # None because the bot does not read from the websocket while on_step runs,
+        # so a pong could arrive late and aiohttp would close a healthy connection
+        self.heartbeat = heartbeat
+        # 0 means no limit, late game observations can be bigger than the 4 MB aiohttp allows by default
+        self.max_msg_size = max_msg_size
+        self.session = None
+        self.ws_connection = None
+        # request type -> list of round trip times in seconds
+        self.latencies = {}
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession()
+        try:
+            self.ws_connection = await self.connect()
+        except Exception:
+            await self.session.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.ws_connection.close()
+        await self.session.close()
+
+    async def connect(self):
+        # the ladder manager might not be listening yet, try a few times before giving up
+        deadline = time.monotonic() + self.max_wait
+        attempts = 0
+        while attempts < self.retries and time.monotonic() < deadline:
+            attempts += 1
+            try:
+                # the timeout argument of ws_connect is for closing the websocket, so the attempt is timed here
+                return await asyncio.wait_for(
+                    self.session.ws_connect(
+                        self.ws_url,
+                        # compression only costs cpu time, the ladder server runs on the same machine
+                        compress=0,
+                        heartbeat=self.heartbeat,
+                        max_msg_size=self.max_msg_size,
+                    ),
+                    min(self.connect_timeout, deadline - time.monotonic()),
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                logging.warning(f"Connecting to {self.ws_url} failed ({attempts}/{self.retries}): {e!r}")
+                if attempts < self.retries:
+                    await asyncio.sleep(min(self.retry_delay, max(deadline - time.monotonic(), 0)))
+        raise ConnectionError(f"Could not connect to {self.ws_url} after {attempts} attempts")
+
+    def client(self):
+        # sc2 client that records how long every request takes
+        client = Client(self.ws_connection)
+        execute = client._execute
+
+        async def timed_execute(**kwargs):
+            start = time.perf_counter()
+            try:
+                return await execute(**kwargs)
+            finally:
+                self.latencies.setdefault(next(iter(kwargs)), []).append(time.perf_counter() - start)
+
+        client._execute = timed_execute
+        return client
+
+    def latency_stats(self):
+        # request type -> number of requests, mean and max round trip time in milliseconds
+        return {
+            request: {
+                "count": len(times),
+                "mean_ms": 1000 * sum(times) / len(times),
+                "max_ms": 1000 * max(times),
+            }
+            for request, times in self.latencies.items()
+        }
+
+
 # Modified version of sc2.main._join_game to allow custom host and port,
 # and to not spawn an additional sc2process (thanks to alkurbatov for fix)
 async def join_ladder_game(
     host, port, players, realtime, portconfig, save_replay_as=None, step_time_limit=None, game_time_limit=None
 ):
-    ws_url = f"ws://{host}:{port}/sc2api"
-    ws_connection = await aiohttp.ClientSession().ws_connect(ws_url, timeout=120)
-    client = Client(ws_connection)
-
     try:
-        result = await sc2.main._play_game(players[0], client, realtime, portconfig, step_time_limit, game_time_limit)
-        if save_replay_as is not None:
-            await client.save_replay(save_replay_as)
-
+        connection = LadderConnection(host, port)
+        async with connection:
+            client = connection.client()
+            try:
+                result = await sc2.main._play_game(
+                    players[0], client, realtime, portconfig, step_time_limit, game_time_limit
+                )
+                if save_replay_as is not None:
+                    await client.save_replay(save_replay_as)
+            finally:
+                for request, stats in connection.latency_stats().items():
+                    logging.info(
+                        f"{request}: {stats['count']} requests, "
+                        f"mean {stats['mean_ms']:.2f} ms, max {stats['max_ms']:.2f} ms"
+                    )
+    except ConnectionError as e:
+        logging.error(e)
+        return None
     except ConnectionAlreadyClosed:
         logging.error(f"Connection was closed before the game ended")
         return None
-    finally:
-        # await ws_connection.close() ?
-
-        # __init__.py:81: RuntimeWarning: coroutine 'ClientWebSocketResponse.close' was never awaited
-        # ws_connection.close()
-        ws_connection.close()
 
     return result
@@ -0,0 +1,65 @@
+from sc2.ids.ability_id import AbilityId as AbilID
+from sc2.position import Point2
+
+# commands without target that change nothing if the unit already follows them, other commands without target
+# like training a unit or morphing queue something new every time and are never repeats
+NO_TARGET_REPEATS = {AbilID.STOP, AbilID.HOLDPOSITION, AbilID.BURROWDOWN, AbilID.BURROWUP, AbilID.HARVEST_RETURN}
+
+
+class ActionFilter:
+    # removes commands that would not change what a unit is doing and puts equal commands next to each other,
+    # python-sc2 sends commands that follow each other with the same ability and target as one multi unit action
+    def __init__(self, game_data, tolerance: float = 0.5):
+        self.game_data = game_data
+        # new move or attack positions closer than this to the current order target count as the same order
+        self.tolerance = tolerance
+        # counts of the last frame and of the whole game
+        self.sent = 0
+        self.suppressed = 0
+        self.commands = 0
+        self.total_sent = 0
+        self.total_suppressed = 0
+
+    def is_repeat(self, action) -> bool:
+        # true if the unit already has this order, queued commands are never repeats
+        if action.queue or not action.unit.orders:
+            return False
+        order = action.unit.orders[0]
+        # orders show the general ability, for example MOVE instead of MOVE_MOVE, so compare those
+        ability = self.game_data.abilities[action.ability.value].id
+        if order.ability.id != ability:
+            return False
+        target = action.target
+        if target is None:
+            return ability in NO_TARGET_REPEATS
+        if isinstance(target, Point2):
+            # orders on units have the tag as target, orders on positions have a point
+            if isinstance(order.target, int):
+                return False
+            dx = order.target.x - target.x
+            dy = order.target.y - target.y
+            return dx * dx + dy * dy <= self.tolerance * self.tolerance
+        return order.target == target.tag
+
+    def filter(self, actions: list) -> list:
+        # returns the actions that need to be sent, grouped by ability, target and queue flag
+        groups = {}
+        suppressed = 0
+        for action in actions:
+            if self.is_repeat(action):
+                suppressed += 1
+                continue
+            target = action.target
+            if isinstance(target, Point2):
+                target_key = (target.x, target.y)
+            elif target is None:
+                target_key = None
+            else:
+                target_key = target.tag
+            groups.setdefault((action.ability, target_key, action.queue), []).append(action)
+        self.sent = len(actions) - suppressed
+        self.suppressed = suppressed
+        self.commands = len(groups)
+        self.total_sent += self.sent
+        self.total_suppressed += suppressed
+        return [action for group in groups.values() for action in group]
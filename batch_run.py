@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import multiprocessing
+import time
+
+import sc2
+from sc2.main import _play_game, _setup_host_game
+from sc2.protocol import ConnectionAlreadyClosed
+from sc2.sc2process import SC2Process
+
+from benchmark import SnapshotClient
+from event_log import log_name
+from Main import RoachRush
+
+# every worker gets its own range of PORTS_PER_WORKER ports starting at BASE_PORT + number of the worker *
+# PORTS_PER_WORKER, so the sc2 clients never fight over a port: the sc2 client listens on the first one,
+# the others are kept free for the ports a game between two bots needs, see run_ladder_game in __init__.py
+BASE_PORT = 7000
+PORTS_PER_WORKER = 6
+
+# set in every worker process by 'init_worker'
+worker_ports = None
+worker_port = None
+
+
+def step_time_stats(step_times):
+    # summary of the step times in milliseconds
+    if not step_times:
+        return {"steps": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(step_times)
+    return {
+        "steps": len(ordered),
+        "mean_ms": round(1000 * sum(ordered) / len(ordered), 3),
+        "p95_ms": round(1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "max_ms": round(1000 * ordered[-1], 3),
+    }
+
+
+def build_matches(maps, races, builds, difficulties, seeds):
+    # one match for every combination of the given settings
+    return [
+        {"map": map_name, "race": race, "build": build, "difficulty": difficulty, "seed": seed}
+        for map_name, race, build, difficulty, seed in itertools.product(maps, races, builds, difficulties, seeds)
+    ]
+
+
+# Modified version of sc2.main._host_game to start the sc2 client on a port we choose
+async def host_batch_game(map_name, players, port, random_seed=None):
+    async with SC2Process(port=port) as server:
+        await server.ping()
+        client = await _setup_host_game(server, sc2.maps.get(map_name), players, False, random_seed)
+        try:
+            result = await _play_game(players[0], client, False, None)
+            await client.leave()
+            await client.quit()
+        except ConnectionAlreadyClosed:
+            logging.error("Connection was closed before the game ended")
+            return None
+    return result
+
+
+async def host_stub_game(snapshot, map_name, players, port, random_seed=None):
+    # same as host_batch_game, but the game comes from a snapshot of benchmark.py instead of sc2,
+    # so the pool, the ports, the bot and the results file can be tested without a game install
+    client = SnapshotClient(snapshot)
+    result = await _play_game(players[0], client, False, None)
+    await client.leave()
+    await client.quit()
+    return result
+
+
+def play_match(match, port, host=host_batch_game):
+    # play one game against the builtin bot with the settings of the match
+    # profile the bot to get the step times, the timeline of every game gets its own file
+    ai = RoachRush(profile=True)
+    ai.profiler.timeline_path = "timeline_{map}_{race}_{build}_{difficulty}_{seed}.csv".format(**match)
+    ai.events.name = log_name("{map}_{race}_{build}_{difficulty}_{seed}".format(**match))
+    builtin_bot = sc2.player.Computer(
+        sc2.Race[match["race"]], sc2.Difficulty[match["difficulty"]], sc2.AIBuild[match["build"]]
+    )
+    players = [sc2.player.Bot(sc2.Race.Zerg, ai), builtin_bot]
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        result = loop.run_until_complete(host(match["map"], players, port, random_seed=match["seed"]))
+    finally:
+        loop.close()
+    return result.name if result else None, ai.time, ai.profiler.step_times()
+
+
+def init_worker(port_slots):
+    # runs once in every worker process, takes a free range of ports for this worker
+    global worker_ports, worker_port
+    start = BASE_PORT + PORTS_PER_WORKER * port_slots.get()
+    worker_ports = range(start, start + PORTS_PER_WORKER)
+    worker_port = worker_ports[0]
+
+
+def run_match(args):
+    play, match = args
+    start = time.perf_counter()
+    try:
+        result, game_time, step_times = play(match, worker_port)
+        error = None
+    except Exception as e:
+        result, game_time, step_times, error = None, 0.0, [], repr(e)
+    return {
+        **match,
+        "port": worker_port,
+        "result": result,
+        "game_time": round(game_time, 2),
+        "wall_time": round(time.perf_counter() - start, 2),
+        "step_time": step_time_stats(step_times),
+        "error": error,
+    }
+
+
+def run_matches(matches, workers, output, play=play_match):
+    # play all matches on a pool of worker processes and write one json line per finished game
+    manager = multiprocessing.Manager()
+    port_slots = manager.Queue()
+    for slot in range(workers):
+        port_slots.put(slot)
+    results = []
+    with open(output, "a") as results_file, multiprocessing.Pool(
+        workers, initializer=init_worker, initargs=(port_slots,)
+    ) as pool:
+        for result in pool.imap_unordered(run_match, [(play, match) for match in matches]):
+            results_file.write(json.dumps(result) + "\n")
+            results_file.flush()
+            results.append(result)
+            match_name = f"{result['map']} {result['race']} {result['build']} {result['difficulty']} {result['seed']}"
+            print(f"{len(results):3}/{len(matches)} {match_name}: {result['result']}")
+    manager.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many local games at once and collect the results")
+    parser.add_argument("--maps", nargs="+", default=["AutomatonLE"], help="Map names")
+    parser.add_argument("--races", nargs="+", default=["Zerg", "Terran", "Protoss", "Random"], help="Opponent races")
+    parser.add_argument(
+        "--builds",
+        nargs="+",
+        default=["RandomBuild", "Rush", "Timing", "Power", "Macro", "Air"],
+        help="Opponent builds",
+    )
+    parser.add_argument("--difficulties", nargs="+", default=["VeryHard"], help="Opponent difficulties")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1], help="Game seeds")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Games played at once")
+    parser.add_argument("--output", default="results.jsonl", help="File the results are appended to")
+    parser.add_argument("--stub", metavar="SNAPSHOT", help="Play this snapshot of benchmark.py instead of starting sc2")
+    args = parser.parse_args()
+
+    matches = build_matches(args.maps, args.races, args.builds, args.difficulties, args.seeds)
+    play = play_match
+    if args.stub:
+        play = functools.partial(play_match, host=functools.partial(host_stub_game, args.stub))
+    results = run_matches(matches, args.workers, args.output, play)
+    wins = sum(result["result"] == "Victory" for result in results)
+    print(f"won {wins} of {len(results)} games, results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import json
+import math
+import os
+from collections import deque
+
+from sc2.constants import ZERG_TECH_REQUIREMENT
+from sc2.dicts.unit_trained_from import UNIT_TRAINED_FROM
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+
+# default buildorder, other files can be passed to RoachRush
+BUILDORDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "buildorder.json")
+# income per drone and game second, used until we measured the real income for a while
+MINERALS_PER_DRONE = 0.94
+VESPENE_PER_DRONE = 0.9
+# drones walk this much faster than their movement speed says, because the game runs on faster speed
+GAME_SPEED = 1.4
+
+
+class BuildStep:
+    __slots__ = ("unit", "supply")
+
+    def __init__(self, unit: UnitID, supply: int = 0):
+        self.unit = unit
+        # the step waits until we use this much supply, no later step starts before it
+        self.supply = supply
+
+    @property
+    def producers(self) -> set:
+        return UNIT_TRAINED_FROM[self.unit]
+
+
+def load_buildorder(path: str):
+    # {"name": ..., "steps": [{"unit": "DRONE"}, {"unit": "OVERLORD", "supply": 13}, ...]}
+    # returns the name and the steps
+    with open(path) as file:
+        data = json.load(file)
+    return data["name"], [BuildStep(UnitID[step["unit"]], step.get("supply", 0)) for step in data["steps"]]
+
+
+class IncomeTracker:
+    # mineral and vespene income per game second, measured over the last seconds of the game
+    def __init__(self, window: float = 10):
+        self.window = window
+        # (time, collected minerals, collected vespene)
+        self.samples = deque()
+        self.minerals_per_second = 0
+        self.vespene_per_second = 0
+
+    def update(self, bot):
+        score = bot.state.score
+        time = bot.time
+        samples = self.samples
+        samples.append((time, score.collected_minerals, score.collected_vespene))
+        while time - samples[0][0] > self.window:
+            samples.popleft()
+        duration = time - samples[0][0]
+        if duration >= self.window / 2:
+            self.minerals_per_second = (samples[-1][1] - samples[0][1]) / duration
+            self.vespene_per_second = (samples[-1][2] - samples[0][2]) / duration
+        else:
+            # not enough measurements yet, guess from the drones we have
+            gas_drones = sum(extractor.assigned_harvesters for extractor in bot.gas_buildings.ready)
+            self.minerals_per_second = max(0, bot.workers.amount - gas_drones) * MINERALS_PER_DRONE
+            self.vespene_per_second = gas_drones * VESPENE_PER_DRONE
+
+    def time_until(self, bot, minerals: float, vespene: float) -> float:
+        # game seconds until we have this much, inf if we dont get what is missing at all
+        missing_minerals = max(0, minerals - bot.minerals)
+        missing_vespene = max(0, vespene - bot.vespene)
+        time = 0
+        for missing, rate in ((missing_minerals, self.minerals_per_second), (missing_vespene, self.vespene_per_second)):
+            if missing:
+                time = max(time, missing / rate if rate > 0 else math.inf)
+        return time
+
+
+def tech_time(bot, unit: UnitID) -> float:
+    # game seconds until the tech requirement of unit is done, inf if it was not started
+    progress = bot.tech_requirement_progress(unit)
+    if progress >= 1:
+        return 0
+    if progress <= 0:
+        return math.inf
+    build_time = bot._game_data.units[ZERG_TECH_REQUIREMENT[unit].value]._proto.build_time
+    return (1 - progress) * build_time / 22.4
+
+
+def travel_time(worker, position) -> float:
+    # game seconds a drone needs to walk to position
+    return worker.distance_to(position) / (worker.movement_speed * GAME_SPEED)
+
+
+class BuildOrder:
+    # steps of the buildorder and which of them are finished,
+    # steps may finish out of order if an earlier step waits for tech or a producer
+    def __init__(self, name: str, steps: list, lookahead: int = 3):
+        self.name = name
+        self.steps = steps
+        # how many steps after the first unfinished one we look at
+        self.lookahead = lookahead
+        self.finished = [False] * len(steps)
+        # first unfinished step
+        self.next_step = 0
+        # step index -> tag of the drone we sent ahead to build it
+        self.builders = {}
+        # step index -> position or geyser where the building goes, chosen once
+        self.positions = {}
+
+    @classmethod
+    def load(cls, path: str = BUILDORDER_PATH):
+        return cls(*load_buildorder(path))
+
+    @property
+    def done(self) -> bool:
+        return self.next_step >= len(self.steps)
+
+    def upcoming(self) -> list:
+        # indices of the first unfinished step and the ones that may start before it
+        indices = [index for index in range(self.next_step, len(self.steps)) if not self.finished[index]]
+        return indices[: self.lookahead + 1]
+
+    def finish(self, index: int):
+        self.finished[index] = True
+        self.builders.pop(index, None)
+        self.positions.pop(index, None)
+        while self.next_step < len(self.steps) and self.finished[self.next_step]:
+            self.next_step += 1
@@ -1,31 +1,230 @@
+import argparse
+import ast
+import hashlib
+import importlib.util
+import json
 import os
+import py_compile
+import struct
+import subprocess
+import sys
+import tempfile
 import zipfile
+import zlib
 
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# files the bot reads at runtime, python files are found by following the imports of run.py
+DATA_FILES = ["buildorder.json", "ladderbots.json", "LICENSE", "README.md"]
+DATA_FOLDERS = ["map_data"]
+# compiled and compressed files are kept here between runs, so only changed files are compiled and compressed again
+BUILD_CACHE = os.path.join(ROOT, ".ladder_build")
 
-def zipdir(path, ziph):
-    # ziph is zipfile handle
-    for root, _, files in os.walk(path):
-        for file in files:
-            ziph.write(os.path.join(root, file))
+
+def imported_names(path: str) -> set:
+    # first part of every module name the file imports, also imports inside functions
+    with open(path, "rb") as file:
+        tree = ast.parse(file.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def import_closure(script: str) -> list:
+    # python files of this folder that the script imports, directly or through other modules
+    files = set()
+    todo = [os.path.join(ROOT, script)]
+    while todo:
+        path = todo.pop()
+        if path in files:
+            continue
+        files.add(path)
+        for name in imported_names(path):
+            module = os.path.join(ROOT, name + ".py")
+            if os.path.isfile(module):
+                todo.append(module)
+            elif os.path.isfile(os.path.join(ROOT, name, "__init__.py")):
+                # packages in this folder, like sc2, are taken as a whole,
+                # they import their own modules in ways we dont follow
+                files.update(package_files(name))
+    return sorted(os.path.relpath(path, ROOT) for path in files)
+
+
+def package_files(package: str) -> list:
+    files = []
+    for root, _, names in os.walk(os.path.join(ROOT, package)):
+        if "__pycache__" in root:
+            continue
+        files.extend(os.path.join(root, name) for name in names if name.endswith(".py"))
+    return files
+
+
+def data_files() -> list:
+    files = [name for name in DATA_FILES if os.path.isfile(os.path.join(ROOT, name))]
+    for folder in DATA_FOLDERS:
+        for root, _, names in os.walk(os.path.join(ROOT, folder)):
+            files.extend(os.path.relpath(os.path.join(root, name), ROOT) for name in names)
+    return sorted(files)
+
+
+def compile_module(source: bytes, archive_name: str, optimize: int) -> bytes:
+    # bytecode of the module that python never checks against the source, unpacking the zip changes the
+    # modification time and hashing every source at startup costs time, the pyc always comes from the same zip
+    # as its source, so they cant get out of sync
+    key = hashlib.sha256(source + importlib.util.MAGIC_NUMBER + bytes([optimize])).hexdigest()
+    cached = os.path.join(BUILD_CACHE, f"{key}.pyc")
+    if not os.path.isfile(cached):
+        os.makedirs(BUILD_CACHE, exist_ok=True)
+        with tempfile.TemporaryDirectory() as folder:
+            source_path = os.path.join(folder, os.path.basename(archive_name))
+            with open(source_path, "wb") as file:
+                file.write(source)
+            py_compile.compile(
+                source_path,
+                cfile=cached,
+                dfile=archive_name,
+                doraise=True,
+                optimize=optimize,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+            )
+    with open(cached, "rb") as file:
+        return file.read()
+
+
+def build_entries(script: str) -> dict:
+    # archive name -> content of every file that goes into the zip
+    entries = {}
+    for name in import_closure(script):
+        with open(os.path.join(ROOT, name), "rb") as file:
+            source = file.read()
+        archive_name = name.replace(os.sep, "/")
+        entries[archive_name] = source
+        # ladderbots.json starts the bot with -O, so python looks for the .opt-1.pyc files
+        for optimize in (0, 1):
+            cache_name = importlib.util.cache_from_source(archive_name, optimization=optimize or "")
+            entries[cache_name.replace(os.sep, "/")] = compile_module(source, archive_name, optimize)
+    for name in data_files():
+        with open(os.path.join(ROOT, name), "rb") as file:
+            entries[name.replace(os.sep, "/")] = file.read()
+    return entries
+
+
+def manifest_of(entries: dict) -> dict:
+    return {name: hashlib.sha256(content).hexdigest() for name, content in sorted(entries.items())}
+
+
+def deflate(content: bytes, digest: str) -> tuple:
+    # compressed content as it is stored in the zip and whether it had to be compressed now,
+    # cached by the hash from the manifest, so files that did not change are not compressed again
+    cached = os.path.join(BUILD_CACHE, f"{digest}.deflate")
+    if os.path.isfile(cached):
+        with open(cached, "rb") as file:
+            return file.read(), False
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    data = compressor.compress(content) + compressor.flush()
+    os.makedirs(BUILD_CACHE, exist_ok=True)
+    with open(cached, "wb") as file:
+        file.write(data)
+    return data, True
+
+
+# zip headers, see the zip file format specification, all files get the same date so the zip only changes
+# if a file changed
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+ZIP_VERSION = 20
+DOS_DATE = (1 << 5) | 1
+FILE_ATTRIBUTES = 0o100644 << 16
+
+
+def write_zip(output: str, entries: dict, manifest: dict) -> int:
+    # writes the zip from the compressed files in the build cache, returns how many files had to be compressed
+    # write to a temporary file first so a failed build never leaves half a zip behind
+    temporary = output + ".tmp"
+    compressed = 0
+    central_directory = []
+    with open(temporary, "wb") as file:
+        for name, content in sorted(entries.items()):
+            data, new = deflate(content, manifest[name])
+            compressed += new
+            encoded_name = name.encode()
+            sizes = (zlib.crc32(content), len(data), len(content), len(encoded_name))
+            offset = file.tell()
+            file.write(LOCAL_HEADER.pack(0x04034B50, ZIP_VERSION, 0, zipfile.ZIP_DEFLATED, 0, DOS_DATE, *sizes, 0))
+            file.write(encoded_name)
+            file.write(data)
+            central_directory.append(
+                CENTRAL_HEADER.pack(
+                    0x02014B50,
+                    3 << 8 | ZIP_VERSION,
+                    ZIP_VERSION,
+                    0,
+                    zipfile.ZIP_DEFLATED,
+                    0,
+                    DOS_DATE,
+                    *sizes,
+                    0,
+                    0,
+                    0,
+                    0,
+                    FILE_ATTRIBUTES,
+                    offset,
+                )
+                + encoded_name
+            )
+        start = file.tell()
+        for header in central_directory:
+            file.write(header)
+        size = file.tell() - start
+        count = len(central_directory)
+        file.write(END_OF_CENTRAL_DIRECTORY.pack(0x06054B50, 0, 0, count, count, size, start, 0))
+    os.replace(temporary, output)
+    return compressed
+
+
+def check_zip(output: str, modules: list) -> bool:
+    # unpack the zip and import the bot from there in a fresh interpreter with the same flags as the ladder
+    with tempfile.TemporaryDirectory() as folder:
+        with zipfile.ZipFile(output) as zip_file:
+            zip_file.extractall(folder)
+        command = [sys.executable, "-O", "-c", "; ".join(f"import {module}" for module in modules)]
+        result = subprocess.run(command, cwd=folder, capture_output=True, text=True)
+    if result.returncode:
+        print(result.stderr)
+    return result.returncode == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the bot for the ladder")
+    parser.add_argument("--output", default="RoachRush.zip", help="Zip file to write")
+    parser.add_argument("--script", default="run.py", help="File the ladder starts")
+    parser.add_argument("--force", action="store_true", help="Write the zip even if nothing changed")
+    parser.add_argument("--no-check", action="store_true", help="Dont test if the bot imports from the zip")
+    args = parser.parse_args()
+
+    entries = build_entries(args.script)
+    manifest = manifest_of(entries)
+    manifest_path = args.output + ".manifest.json"
+    if not args.force and os.path.isfile(args.output) and os.path.isfile(manifest_path):
+        with open(manifest_path) as file:
+            if json.load(file) == manifest:
+                print(f"{args.output} is up to date")
+                return
+    compressed = write_zip(args.output, entries, manifest)
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=1)
+    print(f"wrote {len(entries)} files to {args.output}, compressed {compressed} of them")
+    if not args.no_check:
+        modules = [os.path.splitext(args.script)[0], "Main"]
+        if not check_zip(args.output, modules):
+            print(f"{args.output} does not import, see the error above")
+            sys.exit(1)
+        print(f"{args.output} imports fine")
 
 
 if __name__ == "__main__":
-    # create a zip file
-    zipf = zipfile.ZipFile("RoachRush.zip", "w", zipfile.ZIP_DEFLATED)
-    # write sc2 folder
-    zipdir("./sc2", zipf)
-    single_files = [
-        "__init__.py",
-        "data",
-        "ladderbots.json",
-        "LICENSE",
-        "Main.py",
-        "profiler.py",
-        "README.md",
-        "run.py",
-        "create_ladder_zip.py",
-    ]
-    # write single files
-    for single_file in single_files:
-        zipf.write(single_file)
-    zipf.close()
+    main()
@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# one json lines file per game, the ladder keeps the data folder between games
+LOG_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "events")
+
+
+class EventLog:
+    # keeps events in memory and writes them to a file outside of on_step, by a background thread and at game end
+    # logging an event only appends a tuple, turning it into json happens when the events are written
+    def __init__(self, enabled: bool = True, capacity: int = 1 << 15, flush_interval: float = 30):
+        self.enabled = enabled
+        # oldest events are dropped if the thread cant keep up
+        self.events = deque(maxlen=capacity)
+        self.dropped = 0
+        self.flush_interval = flush_interval
+        # file name without .jsonl, callers that play many games at once set it, see batch_run.py
+        self.name = None
+        self.path = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def open(self, default_name: str, folder: str = None):
+        # start writing to <folder>/<name>.jsonl every flush_interval seconds, default_name is used if name is not set
+        # LOG_FOLDER is looked up here and not when the function is defined, so tests can move it
+        if not self.enabled:
+            return
+        folder = folder or LOG_FOLDER
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"{self.name or default_name}.jsonl")
+        self.thread = threading.Thread(target=self.run, name="event-log", daemon=True)
+        self.thread.start()
+
+    def log(self, game_loop: int, kind: str, **fields):
+        if not self.enabled:
+            return
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append((game_loop, kind, fields))
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self.path is None:
+            return
+        # take the events that are there now, on_step may add new ones meanwhile
+        with self.lock:
+            events = [self.events.popleft() for _ in range(len(self.events))]
+            if not events:
+                return
+            with open(self.path, "a") as file:
+                for game_loop, kind, fields in events:
+                    file.write(json.dumps({"loop": game_loop, "event": kind, **fields}, separators=(",", ":")))
+                    file.write("\n")
+
+    def close(self):
+        # stop the thread and write everything that is left
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        if self.dropped:
+            self.log(0, "dropped", count=self.dropped)
+        self.flush()
+
+
+def log_name(opponent=None) -> str:
+    # the process id keeps games apart that start in the same second, like the ones of batch_run.py
+    return f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{opponent or 'local'}"
@@ -0,0 +1,90 @@
+import numpy as np
+from sc2.constants import TARGET_GROUND
+
+from spatial import Spatial
+
+# game loops a shot counts as damage on its way to the target, roach projectiles land in about this time
+SHOT_LOOPS = 6
+
+
+class FireControl:
+    # shares the enemies in range between the units that shoot in this step, so no enemy gets more damage than it
+    # needs while others are left alone, also remembers the shots of the last steps that did not land yet
+    def __init__(self):
+        # target tag -> list of (game loop the shot lands, damage, hp of the target when we shot)
+        self.pending = {}
+        # unit type -> (damage, attacks) of its ground weapon
+        self.weapons = {}
+        # (unit type, armor of the target) -> damage of one shot
+        self.damage = {}
+
+    def weapon(self, unit) -> tuple:
+        weapon = self.weapons.get(unit.type_id)
+        if weapon is None:
+            ground = next((w for w in unit._weapons or () if w.type in TARGET_GROUND), None)
+            weapon = (ground.damage, ground.attacks) if ground else (0, 0)
+            self.weapons[unit.type_id] = weapon
+        return weapon
+
+    def damage_per_shot(self, unit, target) -> float:
+        # damage of one shot after armor, only asked for the target a unit actually shoots at
+        key = (unit.type_id, target.armor)
+        damage = self.damage.get(key)
+        if damage is None:
+            damage, attacks = self.weapon(unit)
+            damage = attacks * max(damage - target.armor, 0.5)
+            self.damage[key] = damage
+        return damage
+
+    def projected_hp(self, spatial: Spatial, game_loop: int) -> np.ndarray:
+        # hp of every target minus the damage of our shots that are still on their way,
+        # a shot landed once it is too old or the target lost hp since we shot
+        projected = spatial.target_hp.copy()
+        pending = {}
+        for index, target in enumerate(spatial.targets):
+            shots = [
+                shot
+                for shot in self.pending.get(target.tag, ())
+                if shot[0] > game_loop and shot[2] <= spatial.target_hp[index]
+            ]
+            if shots:
+                pending[target.tag] = shots
+                projected[index] -= sum(shot[1] for shot in shots)
+        self.pending = pending
+        return projected
+
+    def allocate(self, spatial: Spatial, game_loop: int) -> dict:
+        # army index -> target for every army unit that attacks in this step,
+        # these are ranged units with their weapon ready and melee units with an enemy in range
+        shooters = [
+            int(index)
+            for index in np.flatnonzero(spatial.in_range.any(axis=1))
+            if spatial.army[index].weapon_cooldown == 0 or spatial.army[index].ground_range <= 1
+        ]
+        if not shooters:
+            return {}
+        projected = self.projected_hp(spatial, game_loop)
+        units = [spatial.army[index] for index in shooters]
+        candidates = [spatial.targets_in_range(index, prefer_workers=True) for index in shooters]
+        # units with weapons ready first, of these the ones with the fewest choices, so the others can take
+        # what is left, units that cant shoot yet only follow and dont count their damage
+        ready = np.array([unit.weapon_cooldown == 0 for unit in units], dtype=bool)
+        order = np.lexsort((np.array([c.size for c in candidates]), ~ready))
+        assigned = {}
+        for row in order:
+            choices = candidates[row]
+            alive = choices[projected[choices] > 0]
+            if alive.size:
+                # lowest hp that still needs damage, tag decides if hp is the same
+                target = alive[np.lexsort((spatial.target_tags[alive], projected[alive]))[0]]
+            else:
+                # every target in range dies already, shoot the one where the least damage is wasted
+                target = choices[np.argmax(projected[choices])]
+            enemy = spatial.targets[int(target)]
+            assigned[shooters[row]] = enemy
+            if ready[row]:
+                damage = self.damage_per_shot(units[row], enemy)
+                projected[target] -= damage
+                shot = (game_loop + SHOT_LOOPS, damage, spatial.target_hp[target])
+                self.pending.setdefault(enemy.tag, []).append(shot)
+        return assigned
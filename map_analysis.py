@@ -0,0 +1,149 @@
+import hashlib
+import heapq
+import math
+import os
+import re
+import sys
+
+import numpy as np
+import sc2
+from sc2.position import Point2
+
+# folder with one analysis file per map, created by running this file
+MAP_DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "map_data")
+
+
+def map_hash(game_info) -> str:
+    # terrain and placement grid dont change during a game, so they identify the map version
+    digest = hashlib.sha1()
+    digest.update(game_info.terrain_height.data_numpy.tobytes())
+    digest.update(game_info.placement_grid.data_numpy.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def map_data_path(game_info) -> str:
+    map_name = re.sub(r"[^A-Za-z0-9]+", "", game_info.map_name)
+    return os.path.join(MAP_DATA_FOLDER, f"{map_name}_{map_hash(game_info)}.npz")
+
+
+def walkable_grid(game_info) -> np.ndarray:
+    # placeable cells are walkable as well, this frees the cells below the starting townhalls
+    return (game_info.pathing_grid.data_numpy != 0) | (game_info.placement_grid.data_numpy != 0)
+
+
+def ground_distances(walkable: np.ndarray, source: Point2, targets) -> list:
+    # walking distance from source to every target, dijkstra on the grid with diagonal moves
+    height, width = walkable.shape
+    target_cells = {(int(target.x), int(target.y)) for target in targets}
+    distances = {}
+    start = (int(source.x), int(source.y))
+    queue = [(0.0, start)]
+    seen = {start: 0.0}
+    steps = [(dx, dy, math.hypot(dx, dy)) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+    while queue and len(distances) < len(target_cells):
+        distance, (x, y) = heapq.heappop(queue)
+        if distance > seen[(x, y)]:
+            continue
+        if (x, y) in target_cells:
+            distances[(x, y)] = distance
+        for dx, dy, cost in steps:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and walkable[ny, nx]:
+                new_distance = distance + cost
+                if new_distance < seen.get((nx, ny), math.inf):
+                    seen[(nx, ny)] = new_distance
+                    heapq.heappush(queue, (new_distance, (nx, ny)))
+    return [distances.get((int(target.x), int(target.y)), math.inf) for target in targets]
+
+
+def main_ramp_point(game_info, start: Point2) -> Point2:
+    # same choice as bot.main_base_ramp, but for any start location
+    ramps = [ramp for ramp in game_info.map_ramps if len(ramp.upper) in {2, 5}] or [
+        ramp for ramp in game_info.map_ramps if len(ramp.upper) in {4, 9}
+    ]
+    ramp = min(ramps, key=lambda r: start.distance_to(r.top_center))
+    return ramp.depot_in_middle or ramp.top_center
+
+
+class MapData:
+    # walking distances between all expansions and the main ramp of every start location
+    def __init__(self, expansions, distances, starts, main_ramps):
+        self.expansions = [Point2((float(x), float(y))) for x, y in expansions]
+        self.distances = distances
+        self.starts = [Point2((float(x), float(y))) for x, y in starts]
+        self.main_ramps = [Point2((float(x), float(y))) for x, y in main_ramps]
+
+    @classmethod
+    def analyze(cls, bot):
+        game_info = bot.game_info
+        expansions = list(bot.expansion_locations.keys())
+        walkable = walkable_grid(game_info)
+        distances = np.array([ground_distances(walkable, e, expansions) for e in expansions], dtype=np.float32)
+        starts = [bot.start_location] + list(bot.enemy_start_locations)
+        main_ramps = [main_ramp_point(game_info, start) for start in starts]
+        return cls(expansions, distances, starts, main_ramps)
+
+    @classmethod
+    def load(cls, game_info):
+        # returns None if this map was not analyzed yet
+        path = map_data_path(game_info)
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["expansions"], data["distances"], data["starts"], data["main_ramps"])
+
+    def save(self, game_info):
+        os.makedirs(MAP_DATA_FOLDER, exist_ok=True)
+        np.savez_compressed(
+            map_data_path(game_info),
+            expansions=np.array(self.expansions, dtype=np.float32),
+            distances=self.distances,
+            starts=np.array(self.starts, dtype=np.float32),
+            main_ramps=np.array(self.main_ramps, dtype=np.float32),
+        )
+
+    def closest_expansion(self, position: Point2) -> int:
+        return min(range(len(self.expansions)), key=lambda i: self.expansions[i].distance_to(position))
+
+    def ordered_expansions(self, start: Point2) -> list:
+        # expansions ordered by walking distance from the start location
+        distances = self.distances[self.closest_expansion(start)]
+        order = sorted(range(len(self.expansions)), key=lambda i: distances[i])
+        return [self.expansions[i] for i in order]
+
+    def clear_map_route(self, start: Point2) -> list:
+        # start with the expansion furthest away, then always walk to the closest expansion we did not visit yet
+        distances = self.distances[self.closest_expansion(start)]
+        current = int(np.argmax(np.where(np.isfinite(distances), distances, -1)))
+        route = [current]
+        remaining = set(range(len(self.expansions))) - {current}
+        while remaining:
+            current = min(remaining, key=lambda i: (self.distances[current][i], i))
+            route.append(current)
+            remaining.remove(current)
+        return [self.expansions[i] for i in route]
+
+    def main_ramp(self, start: Point2) -> Point2:
+        index = min(range(len(self.starts)), key=lambda i: self.starts[i].distance_to(start))
+        return self.main_ramps[index]
+
+
+class MapAnalysisBot(sc2.BotAI):
+    # analyzes the map on the first step, saves the result and leaves the game
+    async def on_step(self, iteration):
+        MapData.analyze(self).save(self.game_info)
+        print(f"saved {map_data_path(self.game_info)}")
+        await self._client.leave()
+
+
+if __name__ == "__main__":
+    # python map_analysis.py AutomatonLE ...
+    for map_name in sys.argv[1:]:
+        sc2.run_game(
+            sc2.maps.get(map_name),
+            [
+                sc2.player.Bot(sc2.Race.Zerg, MapAnalysisBot()),
+                sc2.player.Computer(sc2.Race.Random, sc2.Difficulty.VeryEasy),
+            ],
+            realtime=False,
+        )
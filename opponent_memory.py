@@ -0,0 +1,86 @@
+import json
+import os
+import re
+import time
+from collections import Counter
+
+from sc2.position import Point2
+
+# one file per opponent with one json line per game, the ladder keeps this folder between games
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class OpponentMemory:
+    # what we saw in earlier games against the same opponent, and what we see in the current game
+    def __init__(self, opponent_id, folder: str = DATA_FOLDER):
+        self.opponent_id = opponent_id
+        self.path = os.path.join(folder, re.sub(r"[^A-Za-z0-9_-]+", "_", str(opponent_id)) + ".jsonl")
+        # games we played against this opponent before, oldest first
+        self.games = self.load()
+        # current game, filled by 'observe'
+        self.base_found = None
+        self.composition = {}
+
+    def load(self) -> list:
+        if not os.path.isfile(self.path):
+            return []
+        games = []
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    games.append(json.loads(line))
+                except ValueError:
+                    # the last line is broken if a game was killed while writing it
+                    continue
+        return games
+
+    def append(self, game: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as file:
+            file.write(json.dumps(game, separators=(",", ":")))
+            file.write("\n")
+
+    def enemy_bases(self, map_name: str, enemy_start: Point2) -> list:
+        # positions where we found the enemy base on this map and start location, most common first
+        counts = Counter(
+            tuple(game["base_found"])
+            for game in self.games
+            if game.get("base_found")
+            and game.get("map") == map_name
+            and Point2(game["enemy_start"]).distance_to(enemy_start) < 1
+        )
+        return [Point2(position) for position, _ in counts.most_common()]
+
+    def observe(self, bot, route: list):
+        # remember the expansion of the first enemy structure we see and the most enemy units of every type
+        if self.base_found is None and bot.enemy_structures:
+            structure = bot.enemy_structures.first
+            self.base_found = min(route, key=lambda expansion: expansion.distance_to(structure))
+        for type_id, units in bot.index.enemy_by_type.items():
+            if len(units) > self.composition.get(type_id.name, 0):
+                self.composition[type_id.name] = len(units)
+
+    def save(self, bot, result, buildorder: str):
+        self.append(
+            {
+                "time": int(time.time()),
+                "map": bot.game_info.map_name,
+                "enemy_race": bot.enemy_race.name,
+                "enemy_start": list(bot.enemy_start_locations[0]),
+                "base_found": list(self.base_found) if self.base_found else None,
+                "composition": self.composition,
+                "buildorder": buildorder,
+                "game_loop": bot.state.game_loop,
+                "result": result.name,
+            }
+        )
+
+
+def prioritize(route: list, bases: list) -> list:
+    # moves the expansions closest to the given bases to the front of the route, keeps the rest in order
+    first = []
+    for base in bases:
+        expansion = min(route, key=lambda e: e.distance_to(base))
+        if expansion not in first:
+            first.append(expansion)
+    return first + [expansion for expansion in route if expansion not in first]
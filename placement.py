@@ -0,0 +1,138 @@
+from itertools import chain
+
+import numpy as np
+from sc2.data import ActionResult
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+from sc2.position import Point2
+
+# zerg buildings that can be placed without creep
+NO_CREEP_NEEDED = {UnitID.HATCHERY, UnitID.EXTRACTOR}
+# footprints that are not square, width and height
+FOOTPRINTS = {
+    mineral: (2, 1)
+    for mineral in {
+        UnitID.MINERALFIELD,
+        UnitID.MINERALFIELD750,
+        UnitID.RICHMINERALFIELD,
+        UnitID.RICHMINERALFIELD750,
+        UnitID.LABMINERALFIELD,
+        UnitID.LABMINERALFIELD750,
+        UnitID.PURIFIERMINERALFIELD,
+        UnitID.PURIFIERMINERALFIELD750,
+        UnitID.PURIFIERRICHMINERALFIELD,
+        UnitID.PURIFIERRICHMINERALFIELD750,
+        UnitID.BATTLESTATIONMINERALFIELD,
+        UnitID.BATTLESTATIONMINERALFIELD750,
+    }
+}
+# how long we keep a position reserved for a building we ordered, in game loops
+RESERVATION_LOOPS = 22.4 * 30
+
+
+class PlacementGrid:
+    # our own copy of the placement grid with all known buildings and resources on it
+    # answers where a building fits without asking the client and only asks it to confirm the best positions
+    def __init__(self, bot):
+        self.bot = bot
+        # placement_grid[y, x] is 1 where we could place buildings on an empty map
+        self.placeable = bot.game_info.placement_grid.data_numpy.astype(bool)
+        # number of known buildings, resources and reservations on every cell
+        self.blocked = np.zeros(self.placeable.shape, dtype=np.int16)
+        # tag -> cells of the footprint that we marked as blocked
+        self.footprints = {}
+        # (type id, position) -> game loop the reservation runs out
+        self.reservations = {}
+
+    def footprint_size(self, type_id: UnitID):
+        if type_id in FOOTPRINTS:
+            return FOOTPRINTS[type_id]
+        # the ability that creates a building knows how big it is
+        ability = self.bot._game_data.units[type_id.value].creation_ability
+        if ability and ability._proto.footprint_radius:
+            size = int(round(2 * ability._proto.footprint_radius))
+        else:
+            size = 3
+        FOOTPRINTS[type_id] = (size, size)
+        return size, size
+
+    def footprint_cells(self, type_id: UnitID, position):
+        # slices of the grid that a building of this type covers at this position
+        width, height = self.footprint_size(type_id)
+        x = int(round(position[0] - width / 2))
+        y = int(round(position[1] - height / 2))
+        return slice(max(y, 0), y + height), slice(max(x, 0), x + width)
+
+    def update(self):
+        # add new buildings and resources to the grid and remove the ones that are gone
+        bot = self.bot
+        current = {}
+        for unit in chain(bot.structures, bot.enemy_structures, bot.resources):
+            if not unit.is_flying:
+                current[unit.tag] = unit
+        for tag in [tag for tag in self.footprints if tag not in current]:
+            self.blocked[self.footprints.pop(tag)] -= 1
+        for tag, unit in current.items():
+            if tag not in self.footprints:
+                cells = self.footprint_cells(unit.type_id, unit.position)
+                self.footprints[tag] = cells
+                self.blocked[cells] += 1
+        # reservations end when the building was started or we waited too long for it
+        game_loop = bot.state.game_loop
+        started = {(unit.type_id, unit.position) for unit in bot.structures}
+        for key, end in list(self.reservations.items()):
+            if key in started or game_loop > end:
+                del self.reservations[key]
+                self.blocked[self.footprint_cells(*key)] -= 1
+
+    def reserve(self, type_id: UnitID, position: Point2):
+        # keep the position free for a building that a drone is on its way to build
+        key = (type_id, position)
+        if key not in self.reservations:
+            self.blocked[self.footprint_cells(type_id, position)] += 1
+        self.reservations[key] = self.bot.state.game_loop + RESERVATION_LOOPS
+
+    def candidates(self, type_id: UnitID, near: Point2, max_distance: int = 20, placement_step: int = 2):
+        # all positions around near where the building fits on our grid, closest first
+        width, height = self.footprint_size(type_id)
+        free = self.placeable & (self.blocked == 0)
+        if type_id not in NO_CREEP_NEEDED:
+            free &= self.bot.state.creep.data_numpy.astype(bool)
+        # summed area table, lets us count free cells below every footprint without looping over the cells
+        table = np.zeros((free.shape[0] + 1, free.shape[1] + 1), dtype=np.int32)
+        table[1:, 1:] = free.cumsum(0).cumsum(1)
+        # buildings with odd size are centered on the middle of a cell, even ones on a corner
+        center_x = np.floor(near.x) + 0.5 if width % 2 else np.round(near.x)
+        center_y = np.floor(near.y) + 0.5 if height % 2 else np.round(near.y)
+        offsets = np.arange(-max_distance, max_distance + 1, placement_step)
+        xs, ys = np.meshgrid(center_x + offsets, center_y + offsets)
+        xs, ys = xs.ravel(), ys.ravel()
+        left = np.round(xs - width / 2).astype(int)
+        bottom = np.round(ys - height / 2).astype(int)
+        inside = (left >= 0) & (bottom >= 0) & (left + width <= free.shape[1]) & (bottom + height <= free.shape[0])
+        xs, ys, left, bottom = xs[inside], ys[inside], left[inside], bottom[inside]
+        free_cells = (
+            table[bottom + height, left + width]
+            - table[bottom, left + width]
+            - table[bottom + height, left]
+            + table[bottom, left]
+        )
+        fits = free_cells == width * height
+        xs, ys = xs[fits], ys[fits]
+        order = np.argsort((xs - near.x) ** 2 + (ys - near.y) ** 2, kind="stable")
+        return [Point2((float(xs[i]), float(ys[i]))) for i in order]
+
+    async def find_placement(
+        self, type_id: UnitID, near: Point2, max_distance: int = 20, placement_step: int = 2, confirm: int = 8
+    ):
+        # returns the closest position the client confirms, or None if none of the best candidates work
+        # this sends at most one request, so it never takes more than one round trip
+        self.update()
+        candidates = self.candidates(type_id, near, max_distance, placement_step)[:confirm]
+        if not candidates:
+            return None
+        ability = self.bot._game_data.units[type_id.value].creation_ability
+        results = await self.bot._client.query_building_placement(ability, candidates)
+        for position, result in zip(candidates, results):
+            if result == ActionResult.Success:
+                return position
+        return None
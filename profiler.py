@@ -1,7 +1,14 @@
-import os
+import subprocess
+import sys
 
-# pip install snakeviz
-# run game and create a profile
-os.system("py -3.7 -m cProfile -o profile.prof Main.py")
-# watch it in snakeviz
-os.system("snakeviz profile.prof")
+import Main
+
+if "--cprofile" in sys.argv:
+    # pip install snakeviz
+    # run game and create a profile of the whole process
+    subprocess.call([sys.executable, "-m", "cProfile", "-o", "profile.prof", "Main.py"])
+    # watch it in snakeviz
+    subprocess.call(["snakeviz", "profile.prof"])
+else:
+    # run game and time every phase of on_step, the times are printed and saved to step_timeline.csv at the end
+    Main.main(profile=True)
@@ -1,59 +1,120 @@
-# Imports have to be in this order, leave this comment here to fall back to it if they get messed up
-# import sc2, sys
-# from __init__ import run_ladder_game
-# from sc2 import Race, Difficulty
-# from sc2.player import Bot, Computer
-# import random
-import sc2, sys
-from __init__ import run_ladder_game
-from sc2 import Race, Difficulty
-from sc2.player import Bot, Computer
-import random
-
-# Load bot
-from Main import RoachRush
-
-bot = Bot(Race.Zerg, RoachRush())
+# The ladder starts a new python for every game. Both modes play with the whole bot, and python-sc2 imports
+# numpy and scipy itself, so every mode loads all of that; only the parts to start a ladder or local game are
+# imported by the mode that needs them. sc2 has to be imported before the ladder helper in __init__.py.
+# Run with --import-report <file> to write how long every import took, python -X importtime run.py
+# shows the same for every single module.
+import importlib
+import sys
+import time
+
+# (name, seconds) of every import step, written by 'write_import_report'
+import_times = []
+
+
+class timed:
+    # adds the time the imports inside the with block take to import_times
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        import_times.append((self.name, time.perf_counter() - self.start))
+
+
+def write_import_report(path):
+    with open(path, "w") as report:
+        report.write("import,ms\n")
+        for name, seconds in import_times:
+            report.write(f"{name},{1000 * seconds:.1f}\n")
+        report.write(f"total,{1000 * sum(seconds for _, seconds in import_times):.1f}\n")
+
+
+def create_bot():
+    # numpy and scipy are the biggest part of the python-sc2 import, timed on their own to see that
+    for module in ("numpy", "scipy.spatial.distance"):
+        with timed(module):
+            importlib.import_module(module)
+    with timed("sc2.player"):
+        import sc2
+        from sc2.player import Bot
+    with timed("Main"):
+        from Main import RoachRush
+    return Bot(sc2.Race.Zerg, RoachRush())
+
+
+def ladder_game():
+    # Ladder game started by LadderManager
+    print("Starting ladder game...")
+    # creating the bot imports sc2, which __init__.py needs first
+    bot = create_bot()
+    with timed("__init__"):
+        from __init__ import run_ladder_game
+    report_imports()
+    result, opponentid = run_ladder_game(bot)
+    print(f"{result} against opponent {opponentid}")
+
+
+def local_game():
+    # Local game
+    print("Starting local game...")
+    bot = create_bot()
+    import random
+
+    from sc2 import Difficulty, Race, maps, run_game
+    from sc2.player import Computer
+
+    report_imports()
+    map_name = random.choice(
+        [
+            "(2)16-BitLE",
+            "(2)AcidPlantLE",
+            "(2)CatalystLE",
+            "(2)DreamcatcherLE",
+            "(2)LostandFoundLE",
+            "(2)RedshiftLE",
+            "(4)DarknessSanctuaryLE",
+        ]
+    )
+    map_name = random.choice(
+        [
+            "ProximaStationLE",
+            "NewkirkPrecinctTE",
+            "OdysseyLE",
+            "MechDepotLE",
+            "AscensiontoAiurLE",
+            "BelShirVestigeLE",
+        ]
+    )
+    # map_name = "(2)16-BitLE"
+    run_game(
+        maps.get(map_name),
+        [
+            # Human(Race.Terran),
+            bot,
+            Computer(Race.Random, Difficulty.VeryHard),  # CheatInsane VeryHard
+        ],
+        realtime=False,
+        save_replay_as="Example.SC2Replay",
+    )
+
+
+def report_imports():
+    # the ladder adds its own arguments, so only look for ours instead of parsing all of them
+    if "--import-report" not in sys.argv:
+        return
+    index = sys.argv.index("--import-report") + 1
+    if index < len(sys.argv):
+        write_import_report(sys.argv[index])
+    else:
+        print("--import-report needs a file name, no import report written")
+
 
 # Start game
 if __name__ == "__main__":
     if "--LadderServer" in sys.argv:
-        # Ladder game started by LadderManager
-        print("Starting ladder game...")
-        result, opponentid = run_ladder_game(bot)
-        print(f"{result} against opponent {opponentid}")
+        ladder_game()
     else:
-        # Local game
-        print("Starting local game...")
-        map_name = random.choice(
-            [
-                "(2)16-BitLE",
-                "(2)AcidPlantLE",
-                "(2)CatalystLE",
-                "(2)DreamcatcherLE",
-                "(2)LostandFoundLE",
-                "(2)RedshiftLE",
-                "(4)DarknessSanctuaryLE",
-            ]
-        )
-        map_name = random.choice(
-            [
-                "ProximaStationLE",
-                "NewkirkPrecinctTE",
-                "OdysseyLE",
-                "MechDepotLE",
-                "AscensiontoAiurLE",
-                "BelShirVestigeLE",
-            ]
-        )
-        # map_name = "(2)16-BitLE"
-        sc2.run_game(
-            sc2.maps.get(map_name),
-            [
-                # Human(Race.Terran),
-                bot,
-                Computer(Race.Random, Difficulty.VeryHard),  # CheatInsane VeryHard
-            ],
-            realtime=False,
-            save_replay_as="Example.SC2Replay",
-        )
+        local_game()
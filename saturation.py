@@ -0,0 +1,193 @@
+from collections import defaultdict
+from itertools import chain
+
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+
+# drones inside an extractor are not visible for a moment, so we only forget drones missing longer than this
+MISSING_LOOPS = 3 * 22.4
+# game loops between two comparisons of all drones with our assignments, in between only events and idle drones
+# are looked at, new drones gather on their own until then
+CHECK_LOOPS = 16
+
+
+class WorkerManager:
+    # remembers which resource every drone works on, so it only has to act when something changes:
+    # new, idle or missing drones, extractors and townhalls that finished and resources that ran out
+    def __init__(self, workers_per_mineral: int = 2, workers_per_gas: int = 3, base_distance: float = 10):
+        self.workers_per_mineral = workers_per_mineral
+        self.workers_per_gas = workers_per_gas
+        # mineral fields closer than this to a ready townhall belong to its base
+        self.base_distance = base_distance
+        # drone tag -> resource tag, a drone is never in here twice
+        self.assigned = {}
+        # resource tag -> tags of the drones working on it
+        self.workers_of = defaultdict(set)
+        # drones that do something else, for example walk to build a building
+        self.busy = set()
+        # drone tag -> game loop since which an assigned drone is not visible
+        self.missing_since = {}
+        # resource tag -> how many drones it needs, only mineral fields of our bases and ready extractors
+        self.capacity = {}
+        self.gas_tags = set()
+        # ready townhalls, the mineral fields close to them are ours
+        self.townhall_tags = set()
+        # set if an extractor or townhall finished or a resource ran out, then the resources are collected again
+        self.resources_changed = True
+        # set if one of our drones died or was released, then all drones are checked in the next update
+        self.workers_changed = True
+        self.next_check = 0
+
+    def unit_destroyed(self, unit_tag: int):
+        # a resource that ran out or a townhall whose mineral fields are not ours anymore
+        if unit_tag in self.capacity or unit_tag in self.townhall_tags:
+            self.resources_changed = True
+        if unit_tag in self.assigned or unit_tag in self.busy:
+            self.workers_changed = True
+        self.unassign(unit_tag)
+        self.missing_since.pop(unit_tag, None)
+
+    def structure_ready(self, unit):
+        if unit.type_id in {UnitID.HATCHERY, UnitID.LAIR, UnitID.HIVE, UnitID.EXTRACTOR}:
+            self.resources_changed = True
+
+    def release(self, worker_tag: int):
+        # the drone does something else now and should not get gather commands until it is idle again
+        self.unassign(worker_tag)
+        self.busy.add(worker_tag)
+        self.workers_changed = True
+
+    def unassign(self, worker_tag: int):
+        resource_tag = self.assigned.pop(worker_tag, None)
+        if resource_tag is not None:
+            self.workers_of[resource_tag].discard(worker_tag)
+
+    def assign(self, worker_tag: int, resource_tag: int):
+        self.unassign(worker_tag)
+        self.assigned[worker_tag] = resource_tag
+        self.workers_of[resource_tag].add(worker_tag)
+
+    def collect_resources(self, bot):
+        # which resources of our bases need how many drones
+        townhalls = bot.townhalls.ready
+        self.townhall_tags = townhalls.tags
+        capacity = {}
+        for extractor in bot.gas_buildings.ready:
+            if extractor.has_vespene:
+                capacity[extractor.tag] = self.workers_per_gas
+        self.gas_tags = set(capacity)
+        if townhalls:
+            for mineral in bot.mineral_field:
+                if townhalls.closest_distance_to(mineral) < self.base_distance:
+                    capacity[mineral.tag] = self.workers_per_mineral
+        # drones on resources that are gone need a new job
+        for resource_tag in [tag for tag in self.workers_of if tag not in capacity]:
+            for worker_tag in self.workers_of.pop(resource_tag):
+                del self.assigned[worker_tag]
+        self.capacity = capacity
+
+    def free_slots(self, resource_tag: int) -> int:
+        return self.capacity[resource_tag] - len(self.workers_of[resource_tag])
+
+    def surplus_workers(self) -> set:
+        # drones of mineral fields with too many drones while other mineral fields of our bases have room,
+        # like the drones of the main when the natural finished, as many as the other fields can take
+        minerals = [tag for tag in self.capacity if tag not in self.gas_tags]
+        room = sum(max(0, self.free_slots(tag)) for tag in minerals)
+        surplus = set()
+        for tag in minerals:
+            if room <= 0:
+                break
+            extra = sorted(self.workers_of[tag])[: min(room, max(0, -self.free_slots(tag)))]
+            room -= len(extra)
+            surplus.update(extra)
+        for worker_tag in surplus:
+            self.unassign(worker_tag)
+        return surplus
+
+    def check_workers(self, workers, game_loop: int) -> set:
+        # compares all drones with our assignments, returns the visible drones without a job
+        worker_tags = workers.tags
+        # drones that turned into a building or were not visible for too long
+        for worker_tag in self.assigned.keys() - worker_tags:
+            if game_loop - self.missing_since.setdefault(worker_tag, game_loop) > MISSING_LOOPS:
+                self.unassign(worker_tag)
+                del self.missing_since[worker_tag]
+        for worker_tag in self.missing_since.keys() & worker_tags:
+            del self.missing_since[worker_tag]
+        # busy drones are done once they are gone
+        self.busy &= worker_tags
+        self.workers_changed = False
+        self.next_check = game_loop + CHECK_LOOPS
+        # at the start of the game these are all drones
+        return worker_tags - self.assigned.keys() - self.busy
+
+    def update(self, bot, idle_workers) -> list:
+        # returns (drone, resource) pairs for every drone that needs a gather command
+        workers = bot.workers
+        game_loop = bot.state.game_loop
+        # busy drones are done once they are idle
+        self.busy -= idle_workers.tags
+        unassigned = set()
+        if self.resources_changed:
+            self.collect_resources(bot)
+            self.resources_changed = False
+            unassigned = self.surplus_workers()
+            self.workers_changed = True
+        # comparing all drones costs time with many of them, so it only happens if one of them changed
+        # or every CHECK_LOOPS game loops
+        if self.workers_changed or game_loop >= self.next_check:
+            unassigned |= self.check_workers(workers, game_loop)
+        elif not idle_workers:
+            return []
+        missing_gas = [tag for tag in self.gas_tags if self.free_slots(tag) > 0]
+        if not unassigned and not idle_workers and not missing_gas:
+            return []
+        resources = {unit.tag: unit for unit in chain(bot.mineral_field, bot.gas_buildings)}
+        # drone tag -> (drone, resource), a drone that gets a new job in this step only gets the last command
+        commands = {}
+        # idle drones that have a job just get their gather command again
+        for worker in idle_workers:
+            resource = resources.get(self.assigned.get(worker.tag))
+            if resource:
+                commands[worker.tag] = (worker, resource)
+            else:
+                self.unassign(worker.tag)
+                unassigned.add(worker.tag)
+        # fill extractors, drones without a job first, then drones from minerals closest to the extractor,
+        # the drones on minerals are only looked up once per update
+        mineral_workers = None
+        for gas_tag in missing_gas:
+            extractor = resources[gas_tag]
+            while self.free_slots(gas_tag) > 0:
+                if unassigned:
+                    candidates = workers.tags_in(unassigned)
+                else:
+                    if mineral_workers is None:
+                        mineral_workers = {
+                            tag for tag, resource_tag in self.assigned.items() if resource_tag not in self.gas_tags
+                        }
+                    candidates = workers.tags_in(mineral_workers)
+                if not candidates:
+                    break
+                # prefer drones that dont carry minerals so we dont lose them
+                worker = (candidates.filter(lambda unit: not unit.is_carrying_resource) or candidates).closest_to(
+                    extractor
+                )
+                unassigned.discard(worker.tag)
+                if mineral_workers is not None:
+                    mineral_workers.discard(worker.tag)
+                self.assign(worker.tag, gas_tag)
+                commands[worker.tag] = (worker, extractor)
+        # everybody else goes to the closest mineral field of any base that still has room,
+        # mineral fields only get more drones than they need if all of them are full
+        minerals = [resources[tag] for tag in self.capacity if tag not in self.gas_tags and tag in resources]
+        if not minerals:
+            return list(commands.values())
+        for worker in workers.tags_in(unassigned):
+            mineral = min(
+                minerals,
+                key=lambda m: (max(0, -self.free_slots(m.tag)), self.free_slots(m.tag) <= 0, worker.distance_to(m)),
+            )
+            self.assign(worker.tag, mineral.tag)
+            commands[worker.tag] = (worker, mineral)
+        return list(commands.values())
@@ -0,0 +1,102 @@
+import inspect
+import time
+
+# part of the budget python-sc2 gives us that we plan with, the rest is left for events and sending actions
+BUDGET_SHARE = 0.8
+
+
+class Task:
+    __slots__ = ("name", "run", "priority", "max_interval", "condition", "skipped")
+
+    def __init__(self, name: str, run, priority: int, max_interval: int, condition):
+        self.name = name
+        # method to call, can be async
+        self.run = run
+        # lower runs first
+        self.priority = priority
+        # the task runs at least once every this many steps, even if we are out of time
+        self.max_interval = max_interval
+        # the task only runs if this returns true
+        self.condition = condition
+        # steps the task was skipped in a row
+        self.skipped = 0
+
+
+class StepScheduler:
+    # runs the parts of on_step by priority and skips low priority parts for a few steps if the step takes too long,
+    # also makes game_step bigger if steps keep taking too long and smaller again if they are fast
+    # there is one budget for the whole step, not one per task: tasks run by priority and the ones that come after
+    # the budget is used up wait, max_interval says how many steps a task may wait at most
+    # without a time limit from python-sc2, like in local and batch games, nothing is skipped and game_step stays
+    # deterministic runs every task in every step and keeps game_step, so the bot gives the same commands
+    # on every machine, the benchmark needs that to compare commands with the golden file
+    def __init__(
+        self, min_game_step: int = 2, max_game_step: int = 8, adapt_after: int = 22, deterministic: bool = False
+    ):
+        self.tasks = []
+        self.deterministic = deterministic
+        self.min_game_step = min_game_step
+        self.max_game_step = max_game_step
+        self.game_step = min_game_step
+        # steps between two changes of game_step
+        self.adapt_after = adapt_after
+        self.steps_since_change = 0
+        # average share of the budget that steps used, smoothed over the last steps
+        self.load = 0.0
+        self.budget = float("inf")
+        self.step_start = 0.0
+        # tasks skipped in the current step and in the whole game
+        self.skipped = 0
+        self.total_skipped = 0
+
+    def add(self, name: str, run, priority: int, max_interval: int = 1, condition=None):
+        self.tasks.append(Task(name, run, priority, max_interval, condition))
+        self.tasks.sort(key=lambda task: task.priority)
+
+    def start_step(self, time_budget_available=None):
+        self.step_start = time.perf_counter()
+        if self.deterministic or time_budget_available is None:
+            self.budget = float("inf")
+        else:
+            self.budget = max(0.0, BUDGET_SHARE * time_budget_available)
+        self.skipped = 0
+
+    def elapsed(self) -> float:
+        # seconds since the step started
+        return time.perf_counter() - self.step_start
+
+    def remaining(self) -> float:
+        # seconds left in this step, negative if we are over the budget
+        return self.budget - self.elapsed()
+
+    async def run(self, profiler):
+        for task in self.tasks:
+            if task.condition and not task.condition():
+                continue
+            # out of time, tasks wait for a later step but not longer than they are allowed to
+            if self.remaining() <= 0 and task.skipped + 1 < task.max_interval:
+                task.skipped += 1
+                self.skipped += 1
+                continue
+            task.skipped = 0
+            with profiler.phase(task.name):
+                result = task.run()
+                if inspect.isawaitable(result):
+                    await result
+        self.total_skipped += self.skipped
+
+    def end_step(self) -> int:
+        # returns the game_step we should use from now on
+        if self.budget == float("inf"):
+            return self.game_step
+        used = (time.perf_counter() - self.step_start) / self.budget if self.budget > 0 else 1.0
+        self.load = 0.9 * self.load + 0.1 * used
+        self.steps_since_change += 1
+        if self.steps_since_change >= self.adapt_after:
+            if (self.load > 0.8 or self.skipped) and self.game_step < self.max_game_step:
+                self.game_step += 1
+                self.steps_since_change = 0
+            elif self.load < 0.3 and self.game_step > self.min_game_step:
+                self.game_step -= 1
+                self.steps_since_change = 0
+        return self.game_step
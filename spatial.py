@@ -0,0 +1,84 @@
+import numpy as np
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+from sc2.units import Units
+
+
+def unit_positions(units: Units) -> np.ndarray:
+    # positions of all units as array with one row per unit, in the same order as the units
+    return np.array([unit.position_tuple for unit in units], dtype=float).reshape(-1, 2)
+
+
+def attack_range_matrix(attackers: Units, targets: Units, distances: np.ndarray) -> np.ndarray:
+    # same check as unit.target_in_range, but for every attacker and target pair at once
+    # distances is the matrix of center distances with one row per attacker and one column per target
+    attacker_radius = np.array([unit.radius for unit in attackers], dtype=float)
+    target_radius = np.array([unit.radius for unit in targets], dtype=float)
+    ground_range = np.array([unit.ground_range if unit.can_attack_ground else -1 for unit in attackers], dtype=float)
+    air_range = np.array([unit.air_range if unit.can_attack_air else -1 for unit in attackers], dtype=float)
+    can_attack_ground = ground_range >= 0
+    can_attack_air = air_range >= 0
+    flying = np.array([unit.is_flying for unit in targets], dtype=bool)
+    colossus = np.array([unit.type_id == UnitID.COLOSSUS for unit in targets], dtype=bool)
+    # ground weapons are used for every target on the ground, air weapons for flying targets and colossi
+    use_ground = can_attack_ground[:, None] & ~flying[None, :]
+    use_air = ~use_ground & can_attack_air[:, None] & (flying | colossus)[None, :]
+    weapon_range = np.where(use_ground, ground_range[:, None], air_range[:, None])
+    max_distance = attacker_radius[:, None] + target_radius[None, :] + weapon_range
+    return (use_ground | use_air) & (distances <= max_distance)
+
+
+def distance_matrix(positions_a: np.ndarray, positions_b: np.ndarray) -> np.ndarray:
+    difference = positions_a[:, None, :] - positions_b[None, :, :]
+    return np.sqrt(np.einsum("ijk,ijk->ij", difference, difference))
+
+
+class Spatial:
+    # all distance questions control_army asks about the army and one group of targets, answered in one batch
+    # row i always belongs to army[i] and column j to targets[j]
+    def __init__(self, army: Units, targets: Units):
+        self.army = army
+        self.targets = targets
+        army_positions = unit_positions(army)
+        target_positions = unit_positions(targets)
+        # distances between the centers of army units and targets
+        self.distances = distance_matrix(army_positions, target_positions)
+        # which targets every army unit can shoot right now
+        self.in_range = attack_range_matrix(army, targets, self.distances)
+        # distances and attack ranges within the army itself
+        self.army_distances = distance_matrix(army_positions, army_positions)
+        self.army_in_range = attack_range_matrix(army, army, self.army_distances)
+        # keys to pick the lowest hp target, tag decides if health and shield are the same
+        self.target_hp = np.array([target.health + target.shield for target in targets], dtype=float)
+        self.target_tags = np.array([target.tag for target in targets], dtype=np.uint64)
+        self.target_is_worker = np.array(
+            [target.type_id in {UnitID.DRONE, UnitID.SCV, UnitID.PROBE} for target in targets], dtype=bool
+        )
+
+    def targets_in_range(self, index: int, prefer_workers: bool = False) -> np.ndarray:
+        # indices of the targets in range of army unit number index, only workers if there are any and we want them
+        in_range = self.in_range[index]
+        if prefer_workers:
+            workers = in_range & self.target_is_worker
+            if workers.any():
+                in_range = workers
+        return np.flatnonzero(in_range)
+
+    def lowest_hp(self, target_indices: np.ndarray):
+        # same as min(targets, key=lambda e: (e.health + e.shield, e.tag))
+        order = np.lexsort((self.target_tags[target_indices], self.target_hp[target_indices]))
+        return self.targets[int(target_indices[order[0]])]
+
+    def closest(self, index: int, target_indices: np.ndarray = None):
+        # same as targets.closest_to(unit), the first target wins if two are equally far away
+        distances = self.distances[index]
+        if target_indices is None:
+            return self.targets[int(np.argmin(distances))]
+        return self.targets[int(target_indices[np.argmin(distances[target_indices])])]
+
+    def friends_in_range(self, index: int) -> int:
+        # same as len(army.in_attack_range_of(unit)), the unit itself is counted as well
+        return int(np.count_nonzero(self.army_in_range[index]))
+
+    def friends_closer_than(self, index: int, distance: float) -> int:
+        # same as len(army.closer_than(distance, unit.position))
+        return int(np.count_nonzero(self.army_distances[index] < distance))
@@ -0,0 +1,80 @@
+import numpy as np
+from sc2.position import Point2
+from sc2.units import Units
+
+from spatial import unit_positions
+
+
+class Squad:
+    __slots__ = ("id", "indices", "center")
+
+    def __init__(self, squad_id: int, indices: np.ndarray, center: Point2):
+        self.id = squad_id
+        # indices of the squad members in the army selection
+        self.indices = indices
+        self.center = center
+
+
+class SquadManager:
+    # groups the army into squads of units that are close to each other,
+    # squads are kept from the last frame so only units that moved away or are new have to be assigned again
+    def __init__(self, radius: float = 8):
+        # units further away than this from the center of their squad leave it
+        self.radius = radius
+        # unit tag -> squad id of the last frame
+        self.squad_of = {}
+        self.next_id = 0
+
+    def update(self, army: Units) -> list:
+        if not army:
+            self.squad_of = {}
+            return []
+        positions = unit_positions(army)
+        labels = np.array([self.squad_of.get(unit.tag, -1) for unit in army], dtype=int)
+        # members that are too far from the center of their old squad leave it
+        centers = self.centers(positions, labels)
+        for label, center in centers.items():
+            members = labels == label
+            too_far = members & (np.hypot(*(positions - center).T) > self.radius)
+            labels[too_far] = -1
+        centers = self.centers(positions, labels)
+        # new units join the closest squad in range or start their own
+        for index in np.flatnonzero(labels < 0):
+            position = positions[index]
+            closest = min(centers, key=lambda label: np.hypot(*(centers[label] - position)), default=None)
+            if closest is not None and np.hypot(*(centers[closest] - position)) <= self.radius:
+                labels[index] = closest
+            else:
+                labels[index] = self.next_id
+                centers[self.next_id] = position
+                self.next_id += 1
+        # squads that walked into each other become one
+        centers = self.centers(positions, labels)
+        merged = {}
+        order = sorted(centers)
+        for i, label in enumerate(order):
+            for other in order[:i]:
+                target = merged.get(other, other)
+                if np.hypot(*(centers[label] - centers[other])) <= self.radius / 2:
+                    merged[label] = target
+                    break
+        if merged:
+            labels = np.array([merged.get(label, label) for label in labels], dtype=int)
+            centers = self.centers(positions, labels)
+        self.squad_of = {unit.tag: int(label) for unit, label in zip(army, labels)}
+        return [
+            Squad(label, np.flatnonzero(labels == label), Point2((float(center[0]), float(center[1]))))
+            for label, center in centers.items()
+        ]
+
+    @staticmethod
+    def centers(positions: np.ndarray, labels: np.ndarray) -> dict:
+        # squad id -> mean position of its members, units without squad are left out
+        assigned = labels >= 0
+        if not assigned.any():
+            return {}
+        squad_ids, inverse = np.unique(labels[assigned], return_inverse=True)
+        counts = np.bincount(inverse)
+        xs = np.bincount(inverse, weights=positions[assigned, 0]) / counts
+        ys = np.bincount(inverse, weights=positions[assigned, 1]) / counts
+        return {int(squad_id): np.array((x, y)) for squad_id, x, y in zip(squad_ids, xs, ys)}
@@ -0,0 +1,149 @@
+import time
+from collections import deque
+
+
+class Phase:
+    # context manager that adds the time spent inside it to one phase of the current step
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.add_phase_time(self.name, time.perf_counter() - self.start)
+
+
+class NoPhase:
+    # used when profiling is turned off, does nothing
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NO_PHASE = NoPhase()
+
+
+class StepProfiler:
+    # times every phase of on_step and counts api calls, sent and suppressed actions per step
+    # keeps the last 'window' values of every phase for percentiles and a timeline row for every step
+    def __init__(self, enabled: bool = False, window: int = 1000, timeline_path: str = "step_timeline.csv"):
+        self.enabled = enabled
+        self.window = window
+        self.timeline_path = timeline_path
+        # phase name -> last step times of that phase in seconds
+        self.phase_times = {}
+        # phase times, api calls and actions of the step that is running right now
+        self.step_phases = {}
+        self.step_start = 0.0
+        self.step_iteration = 0
+        self.step_game_loop = 0
+        self.step_api_calls = 0
+        # requests we sent to the sc2 client since the profiler was attached
+        self.api_calls = 0
+        self.client = None
+        # one row per step: iteration, game loop, total ms, api calls, actions, suppressed actions, ms of every phase
+        self.timeline = []
+        self.phase_names = []
+
+    def attach(self, client):
+        # count every request to the sc2 client by wrapping the method all requests go through
+        if not self.enabled or self.client is client:
+            return
+        self.client = client
+        execute = client._execute
+
+        async def counted_execute(**kwargs):
+            self.api_calls += 1
+            return await execute(**kwargs)
+
+        client._execute = counted_execute
+
+    def start_step(self, iteration: int, game_loop: int):
+        if not self.enabled:
+            return
+        self.step_phases = {}
+        self.step_iteration = iteration
+        self.step_game_loop = game_loop
+        self.step_api_calls = self.api_calls
+        self.step_start = time.perf_counter()
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return NO_PHASE
+        return Phase(self, name)
+
+    def add_phase_time(self, name: str, seconds: float):
+        self.step_phases[name] = self.step_phases.get(name, 0.0) + seconds
+
+    def end_step(self, actions: int, suppressed: int = 0):
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.step_start
+        self.add_times("on_step", total)
+        for name, seconds in self.step_phases.items():
+            self.add_times(name, seconds)
+            if name not in self.phase_names:
+                self.phase_names.append(name)
+        self.timeline.append(
+            (
+                self.step_iteration,
+                self.step_game_loop,
+                round(1000 * total, 3),
+                self.api_calls - self.step_api_calls,
+                actions,
+                suppressed,
+                {name: round(1000 * seconds, 3) for name, seconds in self.step_phases.items()},
+            )
+        )
+
+    def add_times(self, name: str, seconds: float):
+        times = self.phase_times.get(name)
+        if times is None:
+            times = self.phase_times[name] = deque(maxlen=self.window)
+        times.append(seconds)
+
+    def percentiles(self, name: str) -> dict:
+        # p50, p95, p99 and max of the last step times of a phase in milliseconds
+        times = sorted(self.phase_times.get(name, ()))
+        if not times:
+            return {}
+        result = {f"p{p}": 1000 * times[min(len(times) - 1, len(times) * p // 100)] for p in (50, 95, 99)}
+        result["max"] = 1000 * times[-1]
+        return result
+
+    def step_times(self) -> list:
+        # total time of every step in seconds
+        return [row[2] / 1000 for row in self.timeline]
+
+    def report(self) -> str:
+        lines = [f"{'phase':20} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)"]
+        for name in ["on_step"] + self.phase_names:
+            stats = self.percentiles(name)
+            if stats:
+                lines.append(
+                    f"{name:20} {stats['p50']:8.3f} {stats['p95']:8.3f} {stats['p99']:8.3f} {stats['max']:8.3f}"
+                )
+        return "\n".join(lines)
+
+    def write_timeline(self):
+        # one line per step, phases that did not run in a step are left empty
+        if not self.enabled or not self.timeline:
+            return
+        with open(self.timeline_path, "w") as timeline_file:
+            columns = ["iteration", "game_loop", "step_ms", "api_calls", "actions", "suppressed"] + self.phase_names
+            timeline_file.write(",".join(columns))
+            timeline_file.write("\n")
+            for iteration, game_loop, total, api_calls, actions, suppressed, phases in self.timeline:
+                values = [iteration, game_loop, total, api_calls, actions, suppressed]
+                values += [phases.get(name, "") for name in self.phase_names]
+                timeline_file.write(",".join(str(value) for value in values))
+                timeline_file.write("\n")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the bot modules live in the folder above, next to run.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,108 @@
+import math
+
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+
+class FakeBot:
+    # the distance functions python-sc2 asks the bot object for, without the cached distance matrix
+    def _distance_squared_unit_to_unit(self, unit1, unit2) -> float:
+        if unit1.tag == unit2.tag:
+            return 0
+        (x1, y1), (x2, y2) = unit1.position_tuple, unit2.position_tuple
+        return (x1 - x2) ** 2 + (y1 - y2) ** 2
+
+    def distance_math_hypot(self, p1, p2) -> float:
+        return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
+
+    def _distance_units_to_pos(self, units, pos):
+        pos = getattr(pos, "position_tuple", pos)
+        return (math.hypot(unit.position_tuple[0] - pos[0], unit.position_tuple[1] - pos[1]) for unit in units)
+
+
+BOT = FakeBot()
+
+
+def fake_property(name):
+    return property(lambda self: self.values[name])
+
+
+# values a FakeUnit has instead of reading them from its proto and the game data
+FIELDS = [
+    "tag",
+    "type_id",
+    "position_tuple",
+    "radius",
+    "ground_range",
+    "air_range",
+    "can_attack_ground",
+    "can_attack_air",
+    "is_flying",
+    "health",
+    "shield",
+    "weapon_cooldown",
+    "is_carrying_resource",
+    "is_carrying_minerals",
+    "is_collecting",
+    "movement_speed",
+    "has_vespene",
+    "is_ready",
+    "orders",
+]
+
+
+class FakeUnit(Unit):
+    # a Unit without proto and game data, so the methods of Unit and Units run on it unchanged
+    next_tag = 1
+
+    def __init__(self, type_id, x, y, radius=0.5, ground_range=0, air_range=0, health=100, shield=0, **values):
+        self.values = {
+            "tag": FakeUnit.next_tag,
+            "type_id": type_id,
+            "position_tuple": (float(x), float(y)),
+            "radius": radius,
+            "ground_range": ground_range,
+            "air_range": air_range,
+            "can_attack_ground": ground_range > 0,
+            "can_attack_air": air_range > 0,
+            "is_flying": False,
+            "health": health,
+            "shield": shield,
+            "weapon_cooldown": 0,
+            "is_carrying_resource": False,
+            "is_carrying_minerals": False,
+            "is_collecting": False,
+            "movement_speed": 0,
+            "has_vespene": True,
+            "is_ready": True,
+            "orders": [],
+            **values,
+        }
+        FakeUnit.next_tag += 1
+        self._bot_object = BOT
+        self.cache = {}
+
+    @property
+    def position(self) -> Point2:
+        return Point2(self.position_tuple)
+
+    def place(self, x, y):
+        self.values["position_tuple"] = (float(x), float(y))
+
+
+for field in FIELDS:
+    setattr(FakeUnit, field, fake_property(field))
+
+
+def units(unit_list) -> Units:
+    return Units(unit_list, BOT)
+
+
+def roach(x, y, **values):
+    return FakeUnit(UnitID.ROACH, x, y, radius=0.625, ground_range=4, health=145, **values)
+
+
+def zergling(x, y, **values):
+    return FakeUnit(UnitID.ZERGLING, x, y, radius=0.375, ground_range=0.1, health=35, **values)
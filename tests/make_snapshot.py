@@ -0,0 +1,214 @@
+# writes the snapshot the tests replay: data/synthetic.snap, its golden file and the map data of its map
+# the game is made up here, so sc2 is not needed: one hatchery with drones, larvae and mineral fields on a flat map
+# that never changes except for our minerals, RecordingRoachRush plays it through SnapshotClient and records it
+# like a real game, run this again if the bot changed on purpose: python tests/make_snapshot.py
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import data_pb2 as data_pb
+from s2clientprotocol import raw_pb2 as raw_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from s2clientprotocol import score_pb2 as score_pb
+
+# the bot modules and the sc2 submodule live in the folder above, like in conftest.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sc2  # noqa: E402
+from sc2.data import Result  # noqa: E402
+from sc2.game_info import GameInfo  # noqa: E402
+from sc2.ids.ability_id import AbilityId as AbilID  # noqa: E402
+from sc2.ids.unit_typeid import UnitTypeId as UnitID  # noqa: E402
+from sc2.main import _play_game  # noqa: E402
+from sc2.player import Bot  # noqa: E402
+
+import benchmark  # noqa: E402
+import map_analysis  # noqa: E402
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SNAPSHOT = os.path.join(DATA_FOLDER, "synthetic.snap")
+MAP_DATA_FOLDER = os.path.join(DATA_FOLDER, "map_data")
+MAP_SIZE = 64
+STEPS = 200
+# the target type is called None in the protocol, which python does not allow as an attribute
+NO_TARGET = data_pb.AbilityData.Target.Value("None")
+
+
+def image(grid: np.ndarray, bits: int):
+    data = np.packbits(grid.astype(np.uint8)) if bits == 1 else grid.astype(np.uint8)
+    return common_pb.ImageData(bits_per_pixel=bits, size=common_pb.Size2DI(x=MAP_SIZE, y=MAP_SIZE), data=data.tobytes())
+
+
+def game_info():
+    # flat map with a border, we start in the bottom left, the enemy in the top right
+    pathable = np.zeros((MAP_SIZE, MAP_SIZE))
+    pathable[2:-2, 2:-2] = 1
+    return sc_pb.ResponseGameInfo(
+        map_name="Synthetic",
+        player_info=[
+            sc_pb.PlayerInfo(player_id=1, type=sc_pb.Participant, race_requested=sc2.Race.Zerg.value),
+            sc_pb.PlayerInfo(
+                player_id=2,
+                type=sc_pb.Computer,
+                race_requested=sc2.Race.Terran.value,
+                difficulty=sc2.Difficulty.VeryHard.value,
+                ai_build=sc2.AIBuild.RandomBuild.value,
+            ),
+        ],
+        start_raw=raw_pb.StartRaw(
+            map_size=common_pb.Size2DI(x=MAP_SIZE, y=MAP_SIZE),
+            pathing_grid=image(pathable, 1),
+            terrain_height=image(100 * pathable, 8),
+            placement_grid=image(pathable, 1),
+            playable_area=common_pb.RectangleI(
+                p0=common_pb.PointI(x=2, y=2), p1=common_pb.PointI(x=MAP_SIZE - 2, y=MAP_SIZE - 2)
+            ),
+            start_locations=[common_pb.Point2D(x=50.5, y=50.5)],
+        ),
+    )
+
+
+def game_data():
+    # only the abilities and units the bot uses in the first minutes
+    def ability(ability_id, target, **fields):
+        return data_pb.AbilityData(
+            ability_id=ability_id.value, link_name=ability_id.name, available=True, target=target, **fields
+        )
+
+    def unit_type(type_id, **fields):
+        return data_pb.UnitTypeData(
+            unit_id=type_id.value, name=type_id.name, available=True, race=sc2.Race.Zerg.value, **fields
+        )
+
+    def building(type_id, ability_id, minerals):
+        return unit_type(type_id, ability_id=ability_id.value, mineral_cost=minerals, attributes=[data_pb.Structure])
+
+    abilities = [
+        ability(AbilID.LARVATRAIN_DRONE, NO_TARGET),
+        ability(AbilID.LARVATRAIN_OVERLORD, NO_TARGET),
+        ability(AbilID.TRAINQUEEN_QUEEN, NO_TARGET),
+        ability(AbilID.HARVEST_GATHER, data_pb.AbilityData.Unit),
+        ability(
+            AbilID.HARVEST_GATHER_DRONE, data_pb.AbilityData.Unit, remaps_to_ability_id=AbilID.HARVEST_GATHER.value
+        ),
+        ability(AbilID.MOVE, data_pb.AbilityData.PointOrUnit),
+        ability(AbilID.MOVE_MOVE, data_pb.AbilityData.PointOrUnit, remaps_to_ability_id=AbilID.MOVE.value),
+    ] + [
+        ability(ability_id, data_pb.AbilityData.Point, is_building=True, footprint_radius=1.5)
+        for ability_id in (AbilID.ZERGBUILD_SPAWNINGPOOL, AbilID.ZERGBUILD_ROACHWARREN)
+    ]
+    abilities.append(ability(AbilID.ZERGBUILD_EXTRACTOR, data_pb.AbilityData.Unit, is_building=True))
+    units = [
+        unit_type(UnitID.HATCHERY, food_provided=6, mineral_cost=300, attributes=[data_pb.Structure]),
+        unit_type(
+            UnitID.DRONE,
+            ability_id=AbilID.LARVATRAIN_DRONE.value,
+            mineral_cost=50,
+            food_required=1,
+            movement_speed=2.8125,
+        ),
+        unit_type(UnitID.LARVA),
+        unit_type(UnitID.OVERLORD, ability_id=AbilID.LARVATRAIN_OVERLORD.value, mineral_cost=100, food_provided=8),
+        unit_type(UnitID.QUEEN, ability_id=AbilID.TRAINQUEEN_QUEEN.value, mineral_cost=150, food_required=2),
+        unit_type(UnitID.MINERALFIELD, has_minerals=True),
+        unit_type(UnitID.VESPENEGEYSER, has_vespene=True),
+        building(UnitID.SPAWNINGPOOL, AbilID.ZERGBUILD_SPAWNINGPOOL, 200),
+        building(UnitID.ROACHWARREN, AbilID.ZERGBUILD_ROACHWARREN, 150),
+        building(UnitID.EXTRACTOR, AbilID.ZERGBUILD_EXTRACTOR, 25),
+    ]
+    return sc_pb.ResponseData(abilities=abilities, units=units)
+
+
+def units():
+    tags = iter(range(1, 100))
+
+    def unit(type_id, x, y, alliance=raw_pb.Self, health=40, radius=0.5, **fields):
+        return raw_pb.Unit(
+            display_type=raw_pb.Visible,
+            alliance=alliance,
+            tag=next(tags) + 1000 * alliance,
+            unit_type=type_id.value,
+            owner=1 if alliance == raw_pb.Self else 16,
+            pos=common_pb.Point(x=x, y=y, z=10),
+            build_progress=1,
+            health=health,
+            health_max=health,
+            radius=radius,
+            **fields,
+        )
+
+    return (
+        [unit(UnitID.HATCHERY, 14.5, 14.5, health=1500, radius=2.75)]
+        + [unit(UnitID.DRONE, 14 + 0.3 * i, 12) for i in range(12)]
+        + [unit(UnitID.LARVA, 15, 13 + 0.2 * i) for i in range(3)]
+        + [unit(UnitID.OVERLORD, 14, 17, is_flying=True)]
+        + [
+            unit(UnitID.MINERALFIELD, 7 + i, 21 + i % 2, raw_pb.Neutral, radius=1.125, mineral_contents=1800)
+            for i in range(8)
+        ]
+        + [
+            unit(UnitID.VESPENEGEYSER, x, 8.5, raw_pb.Neutral, radius=1.8125, vespene_contents=2250)
+            for x in (8.5, 21.5)
+        ]
+    )
+
+
+def observations():
+    all_units = units()
+    creep = np.zeros((MAP_SIZE, MAP_SIZE))
+    creep[4:26, 4:26] = 1
+    map_state = raw_pb.MapState(creep=image(creep, 1), visibility=image(np.full((MAP_SIZE, MAP_SIZE), 2), 8))
+    for step in range(STEPS):
+        yield sc_pb.ResponseObservation(
+            observation=sc_pb.Observation(
+                game_loop=2 * step,
+                player_common=sc_pb.PlayerCommon(
+                    player_id=1, minerals=50 + 2 * step, food_used=12, food_cap=14, food_workers=12
+                ),
+                raw_data=raw_pb.ObservationRaw(player=raw_pb.PlayerRaw(), units=all_units, map_state=map_state),
+                score=score_pb.Score(score_details=score_pb.ScoreDetails(collected_minerals=10 * step)),
+            )
+        )
+
+
+def save_map_data(info):
+    # the map has no ramps, so the bot needs the analysis file to find its main ramp
+    map_data = map_analysis.MapData(
+        expansions=[(14.5, 14.5), (50.5, 50.5), (30.5, 30.5)],
+        distances=np.array([[0, 50, 25], [50, 0, 25], [25, 25, 0]], dtype=np.float32),
+        starts=[(14.5, 14.5), (50.5, 50.5)],
+        main_ramps=[(20, 20), (45, 45)],
+    )
+    map_data.save(GameInfo(info))
+
+
+def main():
+    map_analysis.MAP_DATA_FOLDER = MAP_DATA_FOLDER
+    info = game_info()
+    save_map_data(info)
+    with tempfile.TemporaryDirectory() as folder:
+        # the made up game without query answers, the recording adds them
+        source = os.path.join(folder, "source.snap")
+        writer = benchmark.SnapshotWriter(source)
+        writer.write_header(1, game_data().SerializeToString(), info.SerializeToString())
+        for observation in observations():
+            writer.write_step(observation.SerializeToString(), info.start_raw.pathing_grid.SerializeToString(), [])
+        writer.close()
+        ai = benchmark.RecordingRoachRush(SNAPSHOT)
+        ai.events.enabled = False
+        result = asyncio.run(_play_game(Bot(sc2.Race.Zerg, ai), benchmark.SnapshotClient(source), False, None))
+    # every other result means the bot crashed on the made up game
+    if result != Result.Tie:
+        raise RuntimeError(f"recording ended with {result}, see the error above")
+    run = asyncio.run(benchmark.replay(SNAPSHOT))
+    with open(benchmark.golden_path(SNAPSHOT), "w") as file:
+        json.dump(run["actions"], file)
+    print(f"wrote {SNAPSHOT}, {len(run['actions'])} steps and {sum(map(len, run['actions']))} commands")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from sc2.ids.ability_id import AbilityId as AbilID
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+from sc2.position import Point2
+from sc2.unit_command import UnitCommand
+
+from actions import ActionFilter
+from fakes import FakeUnit, roach
+
+# specific ability -> general ability, like the game data of a real game
+GENERAL = {
+    AbilID.MOVE_MOVE: AbilID.MOVE,
+    AbilID.STOP_STOP: AbilID.STOP,
+    AbilID.BURROWDOWN_ROACH: AbilID.BURROWDOWN,
+    AbilID.LARVATRAIN_DRONE: AbilID.LARVATRAIN_DRONE,
+    AbilID.TRAINQUEEN_QUEEN: AbilID.TRAINQUEEN_QUEEN,
+    AbilID.UPGRADETOLAIR_LAIR: AbilID.UPGRADETOLAIR_LAIR,
+}
+GAME_DATA = SimpleNamespace(
+    abilities={ability.value: SimpleNamespace(id=general) for ability, general in GENERAL.items()}
+)
+
+
+def ordered(unit, ability, target=None):
+    unit.values["orders"] = [SimpleNamespace(ability=SimpleNamespace(id=GENERAL[ability]), target=target)]
+    return unit
+
+
+def test_repeated_stop_and_burrow_are_dropped():
+    action_filter = ActionFilter(GAME_DATA)
+    stopped = ordered(roach(0, 0), AbilID.STOP_STOP)
+    burrowing = ordered(roach(0, 0), AbilID.BURROWDOWN_ROACH)
+    actions = [UnitCommand(AbilID.STOP_STOP, stopped), UnitCommand(AbilID.BURROWDOWN_ROACH, burrowing)]
+    assert action_filter.filter(actions) == []
+    assert action_filter.suppressed == 2
+
+
+def test_second_train_or_morph_is_kept():
+    action_filter = ActionFilter(GAME_DATA)
+    hatchery = ordered(FakeUnit(UnitID.HATCHERY, 0, 0), AbilID.TRAINQUEEN_QUEEN)
+    morphing = ordered(FakeUnit(UnitID.HATCHERY, 9, 0), AbilID.UPGRADETOLAIR_LAIR)
+    actions = [UnitCommand(AbilID.TRAINQUEEN_QUEEN, hatchery), UnitCommand(AbilID.UPGRADETOLAIR_LAIR, morphing)]
+    assert action_filter.filter(actions) == actions
+    assert action_filter.suppressed == 0
+
+
+def test_move_to_the_same_position_is_dropped():
+    action_filter = ActionFilter(GAME_DATA)
+    unit = ordered(roach(0, 0), AbilID.MOVE_MOVE, Point2((10, 10)))
+    same = UnitCommand(AbilID.MOVE_MOVE, unit, Point2((10.2, 10.2)))
+    other = UnitCommand(AbilID.MOVE_MOVE, unit, Point2((12, 10)))
+    assert action_filter.filter([same, other]) == [other]
@@ -0,0 +1,42 @@
+import functools
+import json
+import queue
+
+import batch_run
+import event_log
+import map_analysis
+from make_snapshot import MAP_DATA_FOLDER, SNAPSHOT
+
+
+def test_stub_matches_run_on_the_pool(tmp_path, monkeypatch):
+    # the workers are forked, so they see the patched folders too
+    monkeypatch.setattr(map_analysis, "MAP_DATA_FOLDER", MAP_DATA_FOLDER)
+    monkeypatch.setattr(event_log, "LOG_FOLDER", str(tmp_path / "events"))
+    # the timelines of the games are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    matches = batch_run.build_matches(["Synthetic"], ["Terran", "Protoss"], ["Rush"], ["VeryHard"], [1])
+    play = functools.partial(batch_run.play_match, host=functools.partial(batch_run.host_stub_game, SNAPSHOT))
+    output = tmp_path / "results.jsonl"
+    results = batch_run.run_matches(matches, 2, str(output), play)
+    assert [result["error"] for result in results] == [None, None]
+    assert [result["result"] for result in results] == ["Tie", "Tie"]
+    assert all(result["step_time"]["steps"] > 0 for result in results)
+    assert all(
+        result["port"] in (batch_run.BASE_PORT, batch_run.BASE_PORT + batch_run.PORTS_PER_WORKER) for result in results
+    )
+    assert [json.loads(line) for line in output.read_text().splitlines()] == results
+    assert len(list((tmp_path / "events").iterdir())) == 2
+    assert len(list(tmp_path.glob("timeline_*.csv"))) == 2
+
+
+def test_workers_get_ports_that_dont_overlap():
+    port_slots = queue.Queue()
+    for slot in range(4):
+        port_slots.put(slot)
+    used = set()
+    for _ in range(4):
+        batch_run.init_worker(port_slots)
+        assert batch_run.worker_port == batch_run.worker_ports[0]
+        assert used.isdisjoint(batch_run.worker_ports)
+        used.update(batch_run.worker_ports)
+    assert len(used) == 4 * batch_run.PORTS_PER_WORKER
@@ -0,0 +1,35 @@
+import asyncio
+import json
+
+import pytest
+import sc2
+from sc2.data import Result
+from sc2.main import _play_game
+from sc2.player import Bot
+
+import benchmark
+import map_analysis
+from Main import RoachRush
+from make_snapshot import MAP_DATA_FOLDER, SNAPSHOT
+
+
+@pytest.fixture(autouse=True)
+def map_data(monkeypatch):
+    # the made up map of the snapshot has no ramps, its analysis file lives next to the snapshot
+    monkeypatch.setattr(map_analysis, "MAP_DATA_FOLDER", MAP_DATA_FOLDER)
+
+
+def test_replay_gives_the_commands_of_the_golden_file():
+    run = asyncio.run(benchmark.replay(SNAPSHOT))
+    assert run["divergences"] == []
+    with open(benchmark.golden_path(SNAPSHOT)) as file:
+        assert benchmark.compare_actions(run["actions"], json.load(file)) is None
+
+
+def test_snapshot_client_plays_the_whole_snapshot():
+    client = benchmark.SnapshotClient(SNAPSHOT)
+    ai = RoachRush(log_events=False, deterministic=True)
+    result = asyncio.run(_play_game(Bot(sc2.Race.Zerg, ai), client, False, None))
+    assert result == Result.Tie
+    assert client.iteration == len(client.steps) - 1
+    assert client.divergences == []
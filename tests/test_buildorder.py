@@ -0,0 +1,232 @@
+import asyncio
+import json
+import math
+from types import SimpleNamespace
+
+import pytest
+from sc2.game_data import Cost
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+from sc2.position import Point2
+
+from buildorder import (
+    BUILDORDER_PATH,
+    GAME_SPEED,
+    MINERALS_PER_DRONE,
+    BuildOrder,
+    BuildStep,
+    IncomeTracker,
+    tech_time,
+    travel_time,
+)
+from fakes import FakeUnit, units
+from Main import RoachRush
+
+MINERALS = {
+    UnitID.DRONE: 50,
+    UnitID.OVERLORD: 100,
+    UnitID.QUEEN: 150,
+    UnitID.SPAWNINGPOOL: 200,
+    UnitID.EXTRACTOR: 25,
+    UnitID.ROACHWARREN: 150,
+}
+POOL_BUILD_LOOPS = 1030
+# minerals 12 drones collect per game loop
+INCOME_PER_LOOP = 12 * MINERALS_PER_DRONE / 22.4
+
+
+class SimulatedUnit(FakeUnit):
+    # commands are tuples, so the game can look at them without the game data a real command needs
+    def build(self, unit, position):
+        return "build", self.tag, unit
+
+    def move(self, position):
+        return "move", self.tag, None
+
+    def train(self, unit):
+        return "train", self.tag, unit
+
+
+def drone(x, y):
+    return SimulatedUnit(UnitID.DRONE, x, y, radius=0.375, movement_speed=2.8125, is_collecting=True)
+
+
+class FakePlacement:
+    def __init__(self, position):
+        self.position = position
+
+    async def find_placement(self, unit, near, placement_step=2):
+        return self.position
+
+    def reserve(self, unit, position):
+        pass
+
+
+class SimulatedGame(RoachRush):
+    # the parts of the game the buildorder reads: minerals come in at a fixed rate, every command is done at once
+    # and the spawning pool takes as long as in the game, nothing else changes
+    start_location = Point2((0, 0))
+
+    def __init__(self, buildorder_path: str, minerals: float = 50):
+        super().__init__(buildorder_path=buildorder_path, log_events=False)
+        self.state = SimpleNamespace(game_loop=0, score=SimpleNamespace(collected_minerals=0, collected_vespene=0))
+        self.minerals = minerals
+        self.vespene = 0
+        self.supply_used = 12
+        self.supply_left = 2
+        # drones in a line to the right of the hatchery, the buildings go 10 to the left
+        self.workers = units([drone(3 + i, 0) for i in range(12)])
+        self.larva = units([SimulatedUnit(UnitID.LARVA, 0, 0) for _ in range(3)])
+        self.gas_buildings = units([])
+        self.hatcheries = units([SimulatedUnit(UnitID.HATCHERY, 0, 0, radius=2.75)])
+        self.vespene_geyser = units([SimulatedUnit(UnitID.VESPENEGEYSER, -7, 7, radius=1.8125)])
+        self.main_ramp = Point2((-10, 0))
+        self.placement = FakePlacement(Point2((-10, 0)))
+        self.index = self
+        self._game_data = SimpleNamespace(
+            units={UnitID.SPAWNINGPOOL.value: SimpleNamespace(_proto=SimpleNamespace(build_time=POOL_BUILD_LOOPS))}
+        )
+        self.pool_started = None
+        # (game loop, kind, tag, unit)
+        self.commands = []
+
+    def own(self, types, ready=False, idle=False):
+        types = {types} if isinstance(types, UnitID) else types
+        return self.hatcheries.filter(lambda unit: unit.type_id in types)
+
+    def calculate_cost(self, unit):
+        return Cost(MINERALS[unit], 0)
+
+    def calculate_supply_cost(self, unit):
+        return 0 if unit == UnitID.OVERLORD else 1
+
+    def tech_requirement_progress(self, unit):
+        if unit not in {UnitID.QUEEN, UnitID.ROACHWARREN}:
+            return 1
+        if self.pool_started is None:
+            return 0
+        return min(1, (self.state.game_loop - self.pool_started) / POOL_BUILD_LOOPS)
+
+    def do(self, command, subtract_cost=False, subtract_supply=False):
+        self.commands.append((self.state.game_loop, *command))
+        if subtract_cost:
+            self.minerals -= MINERALS[command[2]]
+        if command[0] == "build" and command[2] == UnitID.SPAWNINGPOOL:
+            self.pool_started = self.state.game_loop
+
+    def commands_of(self, kind: str, unit=None) -> list:
+        return [command for command in self.commands if command[1] == kind and command[3] == unit]
+
+    async def play(self, loops: int, game_step: int = 2):
+        for _ in range(0, loops, game_step):
+            self.state.game_loop += game_step
+            self.minerals += INCOME_PER_LOOP * game_step
+            self.state.score.collected_minerals += INCOME_PER_LOOP * game_step
+            await self.do_buildorder()
+
+
+@pytest.fixture
+def buildorder_file(tmp_path):
+    # writes a buildorder with these units and returns its path
+    def write(*steps) -> str:
+        path = tmp_path / "buildorder.json"
+        path.write_text(json.dumps({"name": "Test", "steps": [{"unit": unit.name} for unit in steps]}))
+        return str(path)
+
+    return write
+
+
+def test_roach_warren_starts_when_the_pool_finishes():
+    game = SimulatedGame(BUILDORDER_PATH)
+    asyncio.run(game.play(3 * 60 * 22))
+    assert game.buildorder.done
+    [(warren_loop, _, builder, _)] = game.commands_of("build", UnitID.ROACHWARREN)
+    assert warren_loop == game.pool_started + POOL_BUILD_LOOPS
+    # the drone was sent ahead so it arrives just in time, not earlier
+    walk_loops = 22.4 * travel_time(game.workers.find_by_tag(builder), game.placement.position)
+    move_loops = [loop for loop, _, tag, _ in game.commands_of("move") if tag == builder and loop < warren_loop]
+    assert warren_loop - walk_loops - 2 <= move_loops[-1] < warren_loop
+
+
+def test_later_steps_only_spend_what_a_waiting_step_leaves(buildorder_file):
+    # the queen waits for the pool and keeps its minerals, the drone after it may only use the rest
+    game = SimulatedGame(buildorder_file(UnitID.QUEEN, UnitID.DRONE), minerals=180)
+    asyncio.run(game.do_buildorder())
+    assert game.commands == []
+    game.minerals = 200
+    asyncio.run(game.do_buildorder())
+    assert [command[1:] for command in game.commands] == [("train", game.larva.first.tag, UnitID.DRONE)]
+    assert game.buildorder.finished == [False, True]
+    assert game.buildorder.next_step == 0
+
+
+def test_a_step_waiting_for_minerals_blocks_later_steps(buildorder_file):
+    game = SimulatedGame(buildorder_file(UnitID.OVERLORD, UnitID.DRONE), minerals=90)
+    asyncio.run(game.do_buildorder())
+    assert game.commands == []
+
+
+def test_builder_leaves_when_the_walk_takes_as_long_as_the_wait(buildorder_file):
+    game = SimulatedGame(buildorder_file(UnitID.SPAWNINGPOOL), minerals=0)
+    builder = game.workers.closest_to(game.placement.position)
+    walk_loops = 22.4 * travel_time(builder, game.placement.position)
+    # measured income, so the wait only depends on the minerals we have
+    game.income.minerals_per_second = INCOME_PER_LOOP * 22.4
+    game.income.update = lambda bot: None
+    for minerals in range(0, 200, 2):
+        game.minerals = minerals
+        asyncio.run(game.do_buildorder())
+        if game.commands:
+            break
+    [(_, kind, tag, _)] = game.commands
+    assert (kind, tag) == ("move", builder.tag)
+    # the drone leaves in the first step the minerals are missing for at most as long as the walk takes
+    wait_loops = (200 - game.minerals) / INCOME_PER_LOOP
+    assert walk_loops - 2 / INCOME_PER_LOOP < wait_loops <= walk_loops
+    assert game.buildorder.builders == {0: builder.tag}
+    # the worker manager leaves the drone alone while it walks
+    assert builder.tag in game.worker_manager.busy
+    game.minerals = 200
+    asyncio.run(game.do_buildorder())
+    assert game.commands[-1][1:] == ("build", builder.tag, UnitID.SPAWNINGPOOL)
+    assert game.buildorder.done
+
+
+def test_buildorder_looks_ahead_and_finishes_out_of_order():
+    buildorder = BuildOrder("Test", [BuildStep(UnitID.DRONE) for _ in range(6)], lookahead=2)
+    assert buildorder.upcoming() == [0, 1, 2]
+    buildorder.builders[1] = 7
+    buildorder.positions[1] = Point2((1, 1))
+    buildorder.finish(1)
+    assert buildorder.upcoming() == [0, 2, 3]
+    assert buildorder.builders == {} and buildorder.positions == {}
+    buildorder.finish(0)
+    assert buildorder.next_step == 2
+    assert buildorder.upcoming() == [2, 3, 4]
+
+
+def test_income_is_guessed_from_drones_until_it_was_measured():
+    game = SimulatedGame(BUILDORDER_PATH)
+    income = IncomeTracker(window=10)
+    income.update(game)
+    assert income.minerals_per_second == pytest.approx(12 * MINERALS_PER_DRONE)
+    # 15 minerals per second for 6 seconds
+    for second in range(1, 7):
+        game.state.game_loop = 22.4 * second
+        game.state.score.collected_minerals = 15 * second
+        income.update(game)
+    assert income.minerals_per_second == pytest.approx(15)
+    game.minerals = 50
+    assert income.time_until(game, 80, 0) == pytest.approx(2)
+    assert income.time_until(game, 20, 0) == 0
+    assert income.time_until(game, 0, 25) == math.inf
+
+
+def test_travel_and_tech_time():
+    worker = drone(0, 0)
+    assert travel_time(worker, Point2((2.8125 * GAME_SPEED * 3, 0))) == pytest.approx(3)
+    game = SimulatedGame(BUILDORDER_PATH)
+    assert tech_time(game, UnitID.ROACHWARREN) == math.inf
+    assert tech_time(game, UnitID.DRONE) == 0
+    game.pool_started = 0
+    game.state.game_loop = POOL_BUILD_LOOPS // 2
+    assert tech_time(game, UnitID.ROACHWARREN) == pytest.approx(POOL_BUILD_LOOPS / 2 / 22.4, abs=0.1)
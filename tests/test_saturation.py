@@ -0,0 +1,136 @@
+import random
+from types import SimpleNamespace
+
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+
+from fakes import FakeUnit, units
+from saturation import CHECK_LOOPS, WorkerManager
+
+
+class FakeGame:
+    # the parts of the bot the worker manager reads, units are added and removed by the tests
+    def __init__(self):
+        self.state = SimpleNamespace(game_loop=0)
+        self.drones = []
+        self.hatcheries = []
+        self.extractors = []
+        self.minerals = []
+
+    def add_base(self, x, y):
+        hatchery = FakeUnit(UnitID.HATCHERY, x, y, radius=2.75)
+        self.hatcheries.append(hatchery)
+        self.minerals += [FakeUnit(UnitID.MINERALFIELD, x + offset, y + 6, radius=0.5) for offset in range(-4, 4)]
+        return hatchery
+
+    def add_drone(self, x, y):
+        drone = FakeUnit(UnitID.DRONE, x, y, radius=0.375, ground_range=0.1)
+        self.drones.append(drone)
+        return drone
+
+    @property
+    def workers(self):
+        return units(self.drones)
+
+    @property
+    def townhalls(self):
+        return units(self.hatcheries)
+
+    @property
+    def gas_buildings(self):
+        return units(self.extractors)
+
+    @property
+    def mineral_field(self):
+        return units(self.minerals)
+
+
+def check_assignments(manager: WorkerManager, commands: list):
+    # every drone works on at most one resource and both lookups agree
+    workers_of = [tag for tags in manager.workers_of.values() for tag in tags]
+    assert len(workers_of) == len(set(workers_of)) == len(manager.assigned)
+    for worker_tag, resource_tag in manager.assigned.items():
+        assert worker_tag in manager.workers_of[resource_tag]
+    assert not manager.busy & manager.assigned.keys()
+    # and gets at most one command per step
+    drones = [drone.tag for drone, _ in commands]
+    assert len(drones) == len(set(drones))
+
+
+def test_no_drone_is_assigned_twice():
+    rng = random.Random(1)
+    game = FakeGame()
+    game.add_base(10, 10)
+    for _ in range(12):
+        game.add_drone(10, 12)
+    manager = WorkerManager()
+    for step in range(300):
+        game.state.game_loop = 2 * step
+        event = rng.random()
+        if event < 0.1:
+            game.add_drone(10, 12)
+        elif event < 0.15 and game.drones:
+            drone = game.drones.pop(rng.randrange(len(game.drones)))
+            manager.unit_destroyed(drone.tag)
+        elif event < 0.2 and game.drones:
+            manager.release(rng.choice(game.drones).tag)
+        elif event < 0.22 and len(game.extractors) < 2:
+            extractor = FakeUnit(UnitID.EXTRACTOR, 3 + 14 * len(game.extractors), 14, radius=1.5)
+            game.extractors.append(extractor)
+            manager.structure_ready(extractor)
+        elif event < 0.25 and len(game.hatcheries) < 2:
+            manager.structure_ready(game.add_base(40, 10))
+        idle = units([drone for drone in game.drones if rng.random() < 0.1])
+        commands = manager.update(game, idle)
+        check_assignments(manager, commands)
+
+
+def test_drones_leave_minerals_of_a_destroyed_hatchery():
+    game = FakeGame()
+    game.add_base(10, 10)
+    expansion = game.add_base(40, 10)
+    expansion_minerals = {mineral.tag for mineral in game.minerals[8:]}
+    for _ in range(24):
+        game.add_drone(25, 12)
+    manager = WorkerManager()
+    manager.update(game, units([]))
+    assert any(manager.workers_of[tag] for tag in expansion_minerals)
+    game.hatcheries.remove(expansion)
+    manager.unit_destroyed(expansion.tag)
+    commands = manager.update(game, units([]))
+    assert not any(manager.workers_of.get(tag) for tag in expansion_minerals)
+    assert {mineral.tag for _, mineral in commands}.isdisjoint(expansion_minerals)
+    assert len(manager.assigned) == len(game.drones)
+    check_assignments(manager, commands)
+
+
+def test_drones_of_an_oversaturated_base_move_to_a_new_hatchery():
+    game = FakeGame()
+    game.add_base(10, 10)
+    for _ in range(24):
+        game.add_drone(10, 12)
+    manager = WorkerManager()
+    manager.update(game, units([]))
+    # 8 mineral fields with 3 drones each
+    assert sorted(len(manager.workers_of[mineral.tag]) for mineral in game.minerals) == [3] * 8
+    expansion = game.add_base(40, 10)
+    manager.structure_ready(expansion)
+    commands = manager.update(game, units([]))
+    assert len(commands) == 8
+    assert {mineral.tag for _, mineral in commands} <= {mineral.tag for mineral in game.minerals[8:]}
+    assert sorted(len(manager.workers_of[mineral.tag]) for mineral in game.minerals) == [0] * 4 + [2] * 12
+    check_assignments(manager, commands)
+
+
+def test_new_drones_get_a_job_at_the_next_check():
+    game = FakeGame()
+    game.add_base(10, 10)
+    for _ in range(12):
+        game.add_drone(10, 12)
+    manager = WorkerManager()
+    manager.update(game, units([]))
+    drone = game.add_drone(10, 12)
+    # nothing changed that the manager knows of, so it does not look at all drones until CHECK_LOOPS passed
+    game.state.game_loop = 2
+    assert manager.update(game, units([])) == []
+    game.state.game_loop = CHECK_LOOPS
+    assert [worker.tag for worker, _ in manager.update(game, units([]))] == [drone.tag]
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from scheduler import StepScheduler
+from step_profiler import StepProfiler
+
+
+def scheduler_with_tasks(ran: list) -> StepScheduler:
+    scheduler = StepScheduler()
+    # the first task uses up any budget, the second may wait two steps
+    scheduler.add("slow", lambda: ran.append("slow") or time.sleep(0.002), 0)
+    scheduler.add("late", lambda: ran.append("late"), 1, max_interval=3)
+    return scheduler
+
+
+def run_steps(scheduler: StepScheduler, steps: int, time_budget_available=None):
+    for _ in range(steps):
+        scheduler.start_step(time_budget_available)
+        asyncio.run(scheduler.run(StepProfiler()))
+        scheduler.end_step()
+
+
+def test_nothing_is_skipped_without_a_time_limit():
+    ran = []
+    scheduler = scheduler_with_tasks(ran)
+    run_steps(scheduler, 100)
+    assert ran.count("late") == 100
+    assert scheduler.total_skipped == 0
+    assert scheduler.game_step == scheduler.min_game_step
+
+
+def test_tasks_wait_at_most_max_interval_steps_when_out_of_time():
+    ran = []
+    scheduler = scheduler_with_tasks(ran)
+    run_steps(scheduler, 30, time_budget_available=0.001)
+    assert ran.count("slow") == 30
+    assert ran.count("late") == 10
+    # steps keep using more than the budget, so the bot asks for more game loops per step
+    assert scheduler.game_step > scheduler.min_game_step
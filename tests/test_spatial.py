@@ -0,0 +1,90 @@
+import random
+
+import pytest
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+
+from fakes import FakeUnit, roach, units, zergling
+from spatial import Spatial
+
+
+def scene(seed: int):
+    # army of roaches, zerglings, hydralisks and corruptors that only shoot air,
+    # against every kind of target the range check treats differently
+    rng = random.Random(seed)
+
+    def position():
+        # few positions so that ties in distance and overlapping units happen
+        return rng.randint(0, 12) / 2, rng.randint(0, 12) / 2
+
+    army = [roach(*position()) for _ in range(8)] + [zergling(*position()) for _ in range(6)]
+    army += [FakeUnit(UnitID.HYDRALISK, *position(), radius=0.625, ground_range=5, air_range=5) for _ in range(4)]
+    army += [FakeUnit(UnitID.CORRUPTOR, *position(), radius=0.625, air_range=6, is_flying=True) for _ in range(3)]
+    targets = [
+        FakeUnit(UnitID.MARINE, *position(), radius=0.375, ground_range=5, air_range=5, health=45) for _ in range(6)
+    ]
+    targets += [
+        FakeUnit(UnitID.SCV, *position(), radius=0.375, ground_range=0.1, health=rng.choice([40, 45])) for _ in range(4)
+    ]
+    targets += [
+        FakeUnit(UnitID.MUTALISK, *position(), radius=0.5, ground_range=3, air_range=3, is_flying=True)
+        for _ in range(3)
+    ]
+    targets += [
+        FakeUnit(UnitID.COLOSSUS, *position(), radius=1, ground_range=7, health=200, shield=150) for _ in range(2)
+    ]
+    rng.shuffle(targets)
+    return units(army), units(targets)
+
+
+def original_targets_in_range(unit, targets, prefer_workers: bool):
+    # the per unit code control_army used before Spatial
+    in_range = targets.in_attack_range_of(unit)
+    if prefer_workers and in_range:
+        workers = in_range({UnitID.DRONE, UnitID.SCV, UnitID.PROBE})
+        if workers:
+            in_range = workers
+    return in_range
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("prefer_workers", [False, True])
+def test_spatial_matches_per_unit_code(seed, prefer_workers):
+    army, targets = scene(seed)
+    spatial = Spatial(army, targets)
+    for index, unit in enumerate(army):
+        expected = original_targets_in_range(unit, targets, prefer_workers)
+        in_range = spatial.targets_in_range(index, prefer_workers=prefer_workers)
+        assert [targets[int(i)].tag for i in in_range] == [target.tag for target in expected]
+        assert spatial.closest(index).tag == targets.closest_to(unit).tag
+        assert spatial.friends_in_range(index) == len(army.in_attack_range_of(unit))
+        assert spatial.friends_closer_than(index, 7) == len(army.closer_than(7, unit.position))
+        if expected:
+            lowest_hp = min(expected, key=lambda e: (e.health + e.shield, e.tag))
+            assert spatial.lowest_hp(in_range).tag == lowest_hp.tag
+            assert spatial.closest(index, in_range).tag == expected.closest_to(unit).tag
+
+
+def test_air_weapons_hit_flying_units_and_colossi():
+    colossus = FakeUnit(UnitID.COLOSSUS, 3, 0, radius=1, ground_range=7)
+    mutalisk = FakeUnit(UnitID.MUTALISK, 0, 3, is_flying=True)
+    marine = FakeUnit(UnitID.MARINE, -3, 0, ground_range=5, air_range=5)
+    targets = units([colossus, mutalisk, marine])
+    corruptor = FakeUnit(UnitID.CORRUPTOR, 0, 0, air_range=6, is_flying=True)
+    army = units([roach(0, 0), FakeUnit(UnitID.HYDRALISK, 0, 0, ground_range=5, air_range=5), corruptor])
+    spatial = Spatial(army, targets)
+    # ground weapons for everything on the ground, the colossus too
+    assert list(spatial.targets_in_range(0)) == [0, 2]
+    assert list(spatial.targets_in_range(1)) == [0, 1, 2]
+    # air weapons for flying units and colossi only
+    assert list(spatial.targets_in_range(2)) == [0, 1]
+
+
+def test_ties_keep_the_order_of_the_per_unit_code():
+    # same hp decides by tag, same distance takes the first target
+    first, second = zergling(2, 0), zergling(0, 2)
+    army = units([roach(0, 0)])
+    targets = units([second, first]) if second.tag < first.tag else units([first, second])
+    spatial = Spatial(army, targets)
+    in_range = spatial.targets_in_range(0)
+    assert spatial.lowest_hp(in_range).tag == min(first.tag, second.tag)
+    assert spatial.closest(0).tag == targets.closest_to(army[0]).tag == targets[0].tag
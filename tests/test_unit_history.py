@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import zergling
+from unit_history import UnitHistory
+
+
+def seen_unit(x, y):
+    unit = zergling(x, y)
+    # update reads the first order straight from the proto
+    unit._proto = SimpleNamespace(orders=[])
+    return unit
+
+
+def test_velocity_follows_a_unit_that_turned():
+    history = UnitHistory()
+    unit = seen_unit(0, 0)
+    # 12 steps of 8 game loops to the right, then 3 steps up
+    for step in range(15):
+        unit.place(min(step, 11), max(0, step - 11))
+        history.update(8 * step, [unit])
+    velocity = history.velocity(unit.tag)
+    assert velocity[0] == pytest.approx(0)
+    assert velocity[1] == pytest.approx(1 / 8)
+    assert tuple(history.predicted_position(unit, 8)) == pytest.approx((11, 4))
+
+
+def test_velocity_is_unknown_for_units_not_seen_recently():
+    history = UnitHistory()
+    unit = seen_unit(0, 0)
+    history.update(0, [unit])
+    unit.place(1, 0)
+    history.update(2, [unit])
+    assert history.velocity(unit.tag) is not None
+    for step in range(2, 20):
+        history.update(2 * step, [])
+    assert history.velocity(unit.tag) is None
+    assert history.predicted_position(unit, 8) == unit.position
+
+
+def test_velocity_is_unknown_without_game_loops_between_samples():
+    history = UnitHistory()
+    unit = seen_unit(0, 0)
+    history.update(10, [unit])
+    unit.place(1, 0)
+    history.update(10, [unit])
+    assert history.velocity(unit.tag) is None
+    assert history.predicted_position(unit, 8) == unit.position
+
+
+def test_memory_stays_flat():
+    history = UnitHistory(frames=4, capacity=8)
+    forever = [seen_unit(0, 0), seen_unit(1, 1)]
+    for step in range(1000):
+        # two units we always see and one new unit every step that is never seen again
+        history.update(2 * step, forever + [seen_unit(2, 2)])
+    # the units seen once are forgotten after a whole ring, so the arrays never had to grow
+    assert len(history.rows) <= 2 + history.frames
+    assert len(history.tags) == 8
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+from sc2.ids.unit_typeid import UnitTypeId as UnitID
+from sc2.position import Point2
+
+# enemies without a ground weapon of their own that still shoot at us, range and dps
+WEAPONLESS_THREATS = {UnitID.BUNKER: (6, 10)}
+# directions we look at around a kiting unit
+DIRECTIONS = 16
+
+
+class ThreatMap:
+    # damage per second enemies can deal on every cell of the map, built once per frame,
+    # so every kiting unit can look up where it is safe without checking every enemy
+    def __init__(self, game_info, margin: float = 1):
+        # cells we cant walk on are never safe
+        self.pathable = game_info.pathing_grid.data_numpy != 0
+        # added to every range, roughly the radius of our units
+        self.margin = margin
+        # threat[y, x] is the summed dps of all enemies that can shoot at the cell
+        self.threat = np.zeros(self.pathable.shape, dtype=np.float32)
+        # radius in cells -> circle mask, so every circle is only calculated once
+        self.masks = {}
+        angles = [2 * math.pi * i / DIRECTIONS for i in range(DIRECTIONS)]
+        self.directions = [(math.cos(angle), math.sin(angle)) for angle in angles]
+
+    def circle(self, radius: int) -> np.ndarray:
+        mask = self.masks.get(radius)
+        if mask is None:
+            offsets = np.arange(-radius, radius + 1)
+            mask = offsets[None, :] ** 2 + offsets[:, None] ** 2 <= radius * radius
+            self.masks[radius] = mask
+        return mask
+
+    def update(self, enemies):
+        threat = self.threat
+        threat.fill(0)
+        height, width = threat.shape
+        for enemy in enemies:
+            if enemy.type_id in WEAPONLESS_THREATS:
+                weapon_range, dps = WEAPONLESS_THREATS[enemy.type_id]
+            else:
+                weapon_range, dps = enemy.ground_range, enemy.ground_dps
+            if dps <= 0:
+                continue
+            radius = int(math.ceil(weapon_range + enemy.radius + self.margin))
+            mask = self.circle(radius)
+            x, y = int(enemy.position_tuple[0]), int(enemy.position_tuple[1])
+            # clip the circle at the map border
+            left, right = max(x - radius, 0), min(x + radius + 1, width)
+            bottom, top = max(y - radius, 0), min(y + radius + 1, height)
+            if left >= right or bottom >= top:
+                continue
+            threat[bottom:top, left:right] += (
+                dps * mask[bottom - y + radius : top - y + radius, left - x + radius : right - x + radius]
+            )
+
+    def threat_at(self, position) -> float:
+        x, y = int(position[0]), int(position[1])
+        if not (0 <= y < self.threat.shape[0] and 0 <= x < self.threat.shape[1]) or not self.pathable[y, x]:
+            return math.inf
+        return float(self.threat[y, x])
+
+    def safest_position(self, position: Point2, preferred: Point2) -> Point2:
+        # the cell with the least threat around position, in the distance of preferred,
+        # if several are equally safe the one closest to preferred wins
+        step = max(position.distance_to(preferred), 2)
+        best = preferred
+        best_key = (self.threat_at(preferred), 0)
+        for dx, dy in self.directions:
+            candidate = Point2((position.x + dx * step, position.y + dy * step))
+            key = (self.threat_at(candidate), candidate.distance_to(preferred))
+            if key < best_key:
+                best, best_key = candidate, key
+        return best
@@ -0,0 +1,106 @@
+import numpy as np
+
+# velocity only looks at the last samples of the last game loops, so units that turned or stopped are not averaged
+# with where they went a few seconds ago, even if game_step is large
+VELOCITY_SAMPLES = 3
+VELOCITY_LOOPS = 24
+
+
+class UnitHistory:
+    # position, health, shield and first order of every unit we saw in the last frames, one row per unit tag
+    # all values live in arrays that are created once, every update only writes one column of them
+    def __init__(self, frames: int = 16, capacity: int = 512):
+        self.frames = frames
+        # tag -> row in the arrays
+        self.rows = {}
+        self.free_rows = list(range(capacity - 1, -1, -1))
+        self.tags = np.zeros(capacity, dtype=np.uint64)
+        # number of the frame every row was last seen in, -1 for rows nobody uses
+        self.last_seen = np.full(capacity, -1, dtype=np.int64)
+        # ring buffers, column frame % frames belongs to the frame with that number
+        self.positions = np.zeros((capacity, frames, 2), dtype=np.float32)
+        self.health = np.zeros((capacity, frames), dtype=np.float32)
+        self.shield = np.zeros((capacity, frames), dtype=np.float32)
+        # ability of the first order, 0 if the unit was idle
+        self.orders = np.zeros((capacity, frames), dtype=np.int32)
+        self.seen = np.zeros((capacity, frames), dtype=bool)
+        self.game_loops = np.zeros(frames, dtype=np.int64)
+        # number of the last frame, -1 before the first update
+        self.frame = -1
+
+    def update(self, game_loop: int, *unit_groups):
+        self.frame += 1
+        column = self.frame % self.frames
+        self.game_loops[column] = game_loop
+        self.seen[:, column] = False
+        # rows of units we didnt see for a whole ring are free again
+        stale = np.flatnonzero((self.last_seen >= 0) & (self.last_seen <= self.frame - self.frames))
+        for row in stale:
+            del self.rows[int(self.tags[row])]
+            self.free_rows.append(int(row))
+        self.last_seen[stale] = -1
+        # write straight into the arrays, collecting the values in lists first would be a bit faster
+        # but creates new lists every frame
+        for units in unit_groups:
+            for unit in units:
+                row = self.row(unit.tag)
+                self.positions[row, column] = unit.position_tuple
+                self.health[row, column] = unit.health
+                self.shield[row, column] = unit.shield
+                unit_orders = unit._proto.orders
+                self.orders[row, column] = unit_orders[0].ability_id if unit_orders else 0
+                self.seen[row, column] = True
+                self.last_seen[row] = self.frame
+
+    def row(self, tag: int) -> int:
+        row = self.rows.get(tag)
+        if row is None:
+            if not self.free_rows:
+                self.grow()
+            row = self.free_rows.pop()
+            self.rows[tag] = row
+            self.tags[row] = tag
+        return row
+
+    def grow(self):
+        # only happens if more units are on the map than ever before, the arrays double their size
+        capacity = len(self.tags)
+        for name in ("tags", "last_seen", "positions", "health", "shield", "orders", "seen"):
+            array = getattr(self, name)
+            grown = np.zeros((2 * capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:capacity] = array
+            setattr(self, name, grown)
+        self.last_seen[capacity:] = -1
+        self.free_rows.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def columns(self, tag: int, loops: int = None) -> np.ndarray:
+        # columns the unit was seen in, oldest first, only the last loops game loops if given
+        row = self.rows.get(tag)
+        if row is None:
+            return np.zeros(0, dtype=np.int64)
+        count = min(self.frame + 1, self.frames)
+        columns = np.arange(self.frame - count + 1, self.frame + 1) % self.frames
+        columns = columns[self.seen[row, columns]]
+        if loops is not None:
+            columns = columns[self.game_loops[columns] >= self.game_loops[self.frame % self.frames] - loops]
+        return columns
+
+    def velocity(self, tag: int):
+        # distance per game loop the unit moved over its last samples, None if we didnt see it move recently
+        columns = self.columns(tag, VELOCITY_LOOPS)[-VELOCITY_SAMPLES:]
+        if columns.size < 2:
+            return None
+        first, last = columns[0], columns[-1]
+        row = self.rows[tag]
+        loops = self.game_loops[last] - self.game_loops[first]
+        if loops <= 0:
+            # all samples are from the same game loop, there is no time to divide by
+            return None
+        return (self.positions[row, last] - self.positions[row, first]) / loops
+
+    def predicted_position(self, unit, loops: int):
+        # where the unit is in loops game loops if it keeps moving like in the last frames
+        velocity = self.velocity(unit.tag)
+        if velocity is None:
+            return unit.position
+        return unit.position.offset((float(velocity[0] * loops), float(velocity[1] * loops)))
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from itertools import chain
+
+from sc2.units import Units
+
+
+class UnitIndex:
+    # groups all visible own and enemy units by type id one time per frame
+    # every selection is only computed the first time it is asked for and then reused for the rest of the frame
+    def __init__(self, bot):
+        self.bot = bot
+        self.own_by_type = defaultdict(list)
+        self.enemy_by_type = defaultdict(list)
+        # structures are not part of self.units, so go through both lists to get everything we own
+        # chain instead of adding the Units objects, because adding them compares every tag with every other tag
+        for unit in chain(bot.units, bot.structures):
+            self.own_by_type[unit.type_id].append(unit)
+        for unit in chain(bot.enemy_units, bot.enemy_structures):
+            self.enemy_by_type[unit.type_id].append(unit)
+        # selections we already calculated this frame, keyed by (owner, types, ready, idle)
+        self.cache = {}
+
+    def own(self, type_ids, ready: bool = False, idle: bool = False) -> Units:
+        return self.select(True, type_ids, ready, idle)
+
+    def enemy(self, type_ids, ready: bool = False, idle: bool = False) -> Units:
+        return self.select(False, type_ids, ready, idle)
+
+    def select(self, owned: bool, type_ids, ready: bool, idle: bool) -> Units:
+        # allow single type ids as well as collections of them
+        if not isinstance(type_ids, (set, frozenset, list, tuple)):
+            type_ids = (type_ids,)
+        key = (owned, frozenset(type_ids), ready, idle)
+        selection = self.cache.get(key)
+        if selection is None:
+            by_type = self.own_by_type if owned else self.enemy_by_type
+            # sort the types so the order of the selection is the same in every run
+            units = [unit for type_id in sorted(key[1], key=lambda t: t.value) for unit in by_type.get(type_id, ())]
+            if ready:
+                units = [unit for unit in units if unit.is_ready]
+            if idle:
+                units = [unit for unit in units if unit.is_idle]
+            selection = Units(units, self.bot)
+            self.cache[key] = selection
+        return selection